@@ -3,22 +3,35 @@
 # ===============================
 import os
 import base64
-from utils import *
+from io import BytesIO
+from utils import AES_WORKERS, ECC_INTERLEAVE, PACKED_CIPHER, atomic_output, map_file
 import adaptiveHuffman
 from aes_dna import (
+    DNA_ALPHABET,
     derive_aes_key_from_dna_file,
-    encrypt_bytes,
-    decrypt_bytes,
-    bytes_to_bitstring,
-    bitstring_to_bytes,
-    nonce_to_b64,
+    decrypt_bytes_stream,
 )
-from ecc import ecc_encode, ecc_decode
+from aes_stream import decrypt_stream, encrypt_parallel
+from dna_codec import (
+    CONSTRAINED_CODE_ID,
+    decode_constrained_codes_stream,
+    decode_constrained_stream,
+    decode_dna_stream,
+    encode_constrained,
+    is_packed,
+    iter_windows,
+    pack_dna,
+    packed_bytes_stream,
+    packed_codes_stream,
+)
+from ecc import NSIZE, NSYM, ecc_encode, ecc_decode_stream
+from envelope import WRAP_ALGORITHM, kek_from_dna_file, new_data_key, unwrap_key, wrap_key
 
 # Base directories
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 KEY_PATH = os.path.join(BASE_DIR, "key", "Key.txt")
 CIPHER_PATH = os.path.join(BASE_DIR, "cipher", "Cipher.txt")
+CIPHER_PACKED_PATH = os.path.join(BASE_DIR, "cipher", "Cipher.2bit")
 DECRYPT_PATH = os.path.join(BASE_DIR, "decrypted")
 DNA_KEY_PATH = os.path.join(BASE_DIR, "dna_sequence.txt")  # physical DNA-based key file
 
@@ -27,76 +40,72 @@ os.makedirs(os.path.dirname(KEY_PATH), exist_ok=True)
 os.makedirs(os.path.dirname(CIPHER_PATH), exist_ok=True)
 os.makedirs(DECRYPT_PATH, exist_ok=True)
 
-# 2-bit → base mapping
-TABLE = {"00": "A", "01": "G", "10": "C", "11": "T"}
+# Key-file algorithm for segmented AES-GCM (aes_stream): the nonce prefix is
+# in the cipher itself. Older "AES-GCM-256" key files carry nonce_b64.
+STREAM_ALGORITHM = "AES-GCM-256-STREAM"
 
 
-def Encode(bitstring: str):
+def Encode(data: bytes) -> str:
     """
-    Encode bitstring to DNA sequence with constraints:
-    - Avoid ≥4 same bases (homopolymers)
-    - Maintain GC% balance
+    Encode bytes to DNA sequence with constraints, deterministically and invertibly:
+    - Homopolymers of at most 2 bases
+    - GC% balanced (every 2-base word is one G/C plus one A/T)
     """
-    dna = []
-    for i in range(0, len(bitstring), 2):
-        pair = bitstring[i:i+2]
-        base = TABLE.get(pair, "A")
-
-        # Prevent long homopolymers
-        if len(dna) >= 3 and dna[-1] == dna[-2] == dna[-3] == base:
-            base = random.choice([b for b in "AGCT" if b != base])
-        dna.append(base)
-    return dna
+    return encode_constrained(data)
 
 
-def FileEncryption(path):
+def FileEncryption(path, packed=PACKED_CIPHER):
     """
     Complete encryption pipeline:
     Compress -> AES-GCM encrypt -> ECC -> DNA encode -> Save cipher + metadata
+    The payload is encrypted under a fresh data key, stored wrapped by the
+    DNA-derived key (envelope.py), so rotating the DNA key only rewrites Key.txt.
+    With packed=True the bases are stored 2 bits each in Cipher.2bit.
     """
     print("Compressing using Adaptive Huffman...")
-    Compressor = adaptiveHuffman.AdaptiveHuffman()
-    Compressor.compress(path, "Compression.txt")
-
-    with open("Compression.txt", "rb") as f:
-        compressed_bytes = f.read()
+    compressed = BytesIO()
+    adaptiveHuffman.AdaptiveHuffman().compress(path, compressed)
+    compressed_bytes = compressed.getvalue()
 
     if not os.path.isfile(DNA_KEY_PATH):
         raise FileNotFoundError(
             f"DNA key file not found: {DNA_KEY_PATH}\nCreate it with your DNA key sequence."
         )
 
-    print("Deriving AES key from physical DNA file...")
-    aes_key = derive_aes_key_from_dna_file(DNA_KEY_PATH, key_bytes=32)
+    print("Deriving key-encryption key from physical DNA file...")
+    kek = kek_from_dna_file(DNA_KEY_PATH)
+    data_key = new_data_key()
 
-    print("Encrypting with AES-GCM...")
-    aes_out = encrypt_bytes(compressed_bytes, aes_key)
-    nonce = aes_out["nonce"]
-    ciphertext_bytes = aes_out["ciphertext"]
+    print("Encrypting with AES-GCM (parallel segments)...")
+    ciphertext_bytes = encrypt_parallel(compressed_bytes, data_key, workers=AES_WORKERS)
 
-    print("Adding Reed–Solomon ECC...")
-    ecc_bytes = ecc_encode(ciphertext_bytes)
+    print(f"Adding Reed–Solomon ECC (interleave depth {ECC_INTERLEAVE})...")
+    ecc_bytes = ecc_encode(ciphertext_bytes, NSYM, depth=ECC_INTERLEAVE)
 
     print("Encoding bytes into DNA bases...")
-    bitstr = bytes_to_bitstring(ecc_bytes)
-    dna_seq = "".join(Encode(bitstr))
+    dna_seq = Encode(ecc_bytes)
 
     print("Saving Cipher and Metadata...")
-    with open(CIPHER_PATH, "w") as cf:
-        cf.write(dna_seq)
+    cipher_path = CIPHER_PACKED_PATH if packed else CIPHER_PATH
+    if packed:
+        with open(cipher_path, "wb") as cf:
+            cf.write(pack_dna(dna_seq))
+    else:
+        with open(cipher_path, "w") as cf:
+            cf.write(dna_seq)
 
     with open(KEY_PATH, "w") as kf:
-        kf.write("algorithm:AES-GCM-256\n")
+        kf.write(f"algorithm:{STREAM_ALGORITHM}\n")
         kf.write(f"dna_file:{os.path.relpath(DNA_KEY_PATH, BASE_DIR)}\n")
-        kf.write(f"nonce_b64:{nonce_to_b64(nonce)}\n")
-
-    # cleanup
-    try:
-        os.remove("Compression.txt")
-    except Exception:
-        pass
+        kf.write(f"key_wrap:{WRAP_ALGORITHM}\n")
+        kf.write(f"wrapped_key_b64:{base64.b64encode(wrap_key(kek, data_key)).decode()}\n")
+        kf.write(f"dna_code:{CONSTRAINED_CODE_ID}\n")
+        kf.write(f"cipher_format:{'2bit' if packed else 'text'}\n")
+        kf.write(f"ecc_nsym:{NSYM}\n")
+        kf.write(f"ecc_nsize:{NSIZE}\n")
+        kf.write(f"ecc_interleave:{ECC_INTERLEAVE}\n")
 
-    print(f"\nEncryption complete ✅\nCipher saved: {CIPHER_PATH}\nMetadata saved: {KEY_PATH}\n")
+    print(f"\nEncryption complete ✅\nCipher saved: {cipher_path}\nMetadata saved: {KEY_PATH}\n")
 
 
 def TextEncryption():
@@ -113,35 +122,44 @@ def TextEncryption():
         pass
 
 
-def Decode(ciphertext: str, key_meta: dict, out_type: str):
+def _dna_bytes(ciphertext, constrained: bool, erasures: list):
     """
-    Decode DNA -> ECC decode -> AES decrypt -> Decompress
+    Bytes of a DNA text or packed .2bit cipher, window by window, warning
+    about invalid symbols. Bytes they touch (and broken constrained-code
+    words) are appended to erasures for ecc_decode_stream().
     """
-    print("Decoding DNA sequence to bits...")
-    # DNA → bitstring
-    bitstr = "".join(
-        list(TABLE.keys())[list(TABLE.values()).index(base)]
-        for base in ciphertext
-        if base in TABLE.values()
-    )
-
-    cipher_bytes = bitstring_to_bytes(bitstr)
-
-    print("Applying ECC correction...")
-    ecc_corrected = ecc_decode(cipher_bytes)
-
-    dna_file = key_meta.get("dna_file", DNA_KEY_PATH)
-    if not os.path.isabs(dna_file):
-        dna_file = os.path.join(BASE_DIR, dna_file)
+    if is_packed(ciphertext):
+        # The .2bit CRC is not checked: ecc_decode_stream() corrects what it would reject
+        if constrained:
+            stream = decode_constrained_codes_stream(packed_codes_stream(ciphertext, verify=False), erase=True)
+        else:
+            stream = ((out, ()) for out in packed_bytes_stream(ciphertext, DNA_ALPHABET, verify=False))
+    elif constrained:
+        stream = decode_constrained_stream(iter_windows(ciphertext), erase=True)
+    else:
+        stream = decode_dna_stream(iter_windows(ciphertext), DNA_ALPHABET, erase=True)
 
-    aes_key = derive_aes_key_from_dna_file(dna_file, key_bytes=32)
+    count, first = 0, []
+    for out, erased in stream:
+        if len(erased):
+            count += len(erased)
+            first.extend(erased[:8 - len(first)].tolist())
+            erasures.append(erased)
+        yield out
+    if count:
+        print(f"Warning: {count} bytes hit by invalid DNA symbols, first at byte positions {first}; "
+              f"decoded as erasures")
 
-    print("Decrypting AES-GCM ciphertext...")
-    nonce = key_meta["nonce_bytes"]
-    compressed_bytes = decrypt_bytes(ecc_corrected, nonce, aes_key)
 
-    print("Decompressing using Adaptive Huffman...")
-    bitstream = "".join(f"{byte:08b}" for byte in compressed_bytes)
+def Decode(ciphertext, key_meta: dict, out_type: str):
+    """
+    Decode DNA -> ECC decode -> AES decrypt -> Decompress
+    ciphertext is the DNA text or a packed .2bit record, typically an mmap of
+    the cipher file: every stage streams in bounded windows, and the output
+    file is only written once every AES tag has verified.
+    """
+    if isinstance(ciphertext, str):
+        ciphertext = ciphertext.encode("latin-1", "replace")
 
     if out_type == "text":
         output_file = os.path.join(DECRYPT_PATH, "PlainTextResult.txt")
@@ -150,7 +168,34 @@ def Decode(ciphertext: str, key_meta: dict, out_type: str):
     else:
         raise ValueError("Unknown out_type: " + str(out_type))
 
-    adaptiveHuffman.AdaptiveHuffman().expand(bitstream, output_file)
+    dna_file = key_meta.get("dna_file", DNA_KEY_PATH)
+    if not os.path.isabs(dna_file):
+        dna_file = os.path.join(BASE_DIR, dna_file)
+
+    print("Decoding DNA -> ECC correction -> AES-GCM -> Adaptive Huffman (streaming)...")
+    erasures = []
+    cipher_bytes = _dna_bytes(ciphertext, key_meta.get("dna_code") == CONSTRAINED_CODE_ID, erasures)
+    # Key files written before interleaving have no ecc_* lines: plain RS(255, 239)
+    ecc_corrected = ecc_decode_stream(
+        cipher_bytes,
+        int(key_meta.get("ecc_nsym", NSYM)),
+        int(key_meta.get("ecc_nsize", NSIZE)),
+        int(key_meta.get("ecc_interleave", 1)),
+        erasures,
+    )
+    if "wrapped_key" in key_meta:
+        data_key = unwrap_key(kek_from_dna_file(dna_file), key_meta["wrapped_key"])
+        compressed = decrypt_stream(ecc_corrected, data_key)
+    elif key_meta.get("algorithm") == STREAM_ALGORITHM:
+        compressed = decrypt_stream(ecc_corrected, derive_aes_key_from_dna_file(dna_file, key_bytes=32))
+    else:
+        aes_key = derive_aes_key_from_dna_file(dna_file, key_bytes=32)
+        compressed = decrypt_bytes_stream(ecc_corrected, key_meta["nonce_bytes"], aes_key)
+    with atomic_output(output_file) as out:
+        adaptiveHuffman.AdaptiveHuffman().expand(compressed, out)
+        # Drain the stream past the end marker so the AES tag gets checked
+        for _ in compressed:
+            pass
     print(f"Decryption complete ✅\nOutput file: {output_file}\n")
 
 
@@ -164,9 +209,6 @@ def Decryption(ciphertext_path, key_path, type):
     if not os.path.isfile(key_path):
         raise FileNotFoundError(f"Key/meta not found: {key_path}")
 
-    with open(ciphertext_path, "r") as cf:
-        ciphertexts = cf.read().strip()
-
     meta_raw = open(key_path, "r").read().splitlines()
     key_meta = {}
     for line in meta_raw:
@@ -176,12 +218,15 @@ def Decryption(ciphertext_path, key_path, type):
         k, v = k.strip(), v.strip()
         if k == "nonce_b64":
             key_meta["nonce_bytes"] = base64.b64decode(v)
+        elif k == "wrapped_key_b64":
+            key_meta["wrapped_key"] = base64.b64decode(v)
         elif k == "dna_file":
             key_meta["dna_file"] = v
         else:
             key_meta[k] = v
 
-    if "nonce_bytes" not in key_meta:
+    if key_meta.get("algorithm") != STREAM_ALGORITHM and "nonce_bytes" not in key_meta:
         raise RuntimeError("Metadata (nonce) missing in key file.")
 
-    Decode(ciphertexts, key_meta, type)
+    with map_file(ciphertext_path) as ciphertext:
+        Decode(ciphertext, key_meta, type)
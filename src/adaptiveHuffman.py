@@ -1,41 +1,140 @@
-import heapq
+import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 
-# Node for Huffman Tree
-class Node:
-    def __init__(self, freq, symbol=None, left=None, right=None):
-        self.freq = freq
-        self.symbol = symbol
-        self.left = left
-        self.right = right
-    def __lt__(self, other):
-        return self.freq < other.freq
-
-# Build Huffman Tree
-def build_tree(data):
-    freq = defaultdict(int)
-    for byte in data:
-        freq[byte] += 1
-    heap = [Node(f, s) for s, f in freq.items()]
-    heapq.heapify(heap)
-    while len(heap) > 1:
-        n1 = heapq.heappop(heap)
-        n2 = heapq.heappop(heap)
-        merged = Node(n1.freq + n2.freq, left=n1, right=n2)
-        heapq.heappush(heap, merged)
-    return heap[0]
-
-# Build Huffman Codes from Tree
-def build_codes(node, prefix="", codebook=None):
-    if codebook is None:
-        codebook = {}
-    if node.symbol is not None:
-        codebook[node.symbol] = prefix
-    else:
-        build_codes(node.left, prefix + "0", codebook)
-        build_codes(node.right, prefix + "1", codebook)
-    return codebook
+import numpy as np
+
+# Longest code length allowed; keeps decode tables small
+MAX_CODE_LEN = 15
+
+# Bytes counted per bincount call: bincount widens them to intp (8x), so this
+# bounds the scratch memory of compress() at 32 KiB next to its output
+COUNT_SLICE = 1 << 12
+
+# Count Byte Frequencies
+def count_frequencies(data):
+    """Histogram of byte values as a length-256 array (zero-copy view of data)."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    arr = np.frombuffer(data, dtype=np.uint8)
+    freq = np.zeros(256, dtype=np.int64)
+    # bincount widens its input to intp, so count in slices to bound memory
+    for i in range(0, len(arr), COUNT_SLICE):
+        freq += np.bincount(arr[i:i + COUNT_SLICE], minlength=256)
+    return freq
+
+# Optimal Code Lengths for Sorted Weights
+def _minimum_redundancy(weights):
+    """
+    In-place two-queue Huffman (Moffat & Katajainen) on weights sorted in
+    ascending order. Returns the code length of each weight, in the same order.
+    """
+    a = list(weights)
+    n = len(a)
+    # Phase 1: build the tree bottom-up; a[] holds merged weights, then parent links
+    a[0] += a[1]
+    root = 0
+    leaf = 2
+    for nxt in range(1, n - 1):
+        if leaf >= n or a[root] < a[leaf]:
+            a[nxt] = a[root]
+            a[root] = nxt
+            root += 1
+        else:
+            a[nxt] = a[leaf]
+            leaf += 1
+        if leaf >= n or (root < nxt and a[root] < a[leaf]):
+            a[nxt] += a[root]
+            a[root] = nxt
+            root += 1
+        else:
+            a[nxt] += a[leaf]
+            leaf += 1
+    # Phase 2: parent links -> internal node depths
+    a[n - 2] = 0
+    for nxt in range(n - 3, -1, -1):
+        a[nxt] = a[a[nxt]] + 1
+    # Phase 3: internal node depths -> leaf depths
+    avail = 1
+    used = 0
+    depth = 0
+    root = n - 2
+    nxt = n - 1
+    while avail > 0:
+        while root >= 0 and a[root] == depth:
+            used += 1
+            root -= 1
+        while avail > used:
+            a[nxt] = depth
+            nxt -= 1
+            avail -= 1
+        avail = 2 * used
+        depth += 1
+        used = 0
+    return a
+
+# Length-Limited Code Lengths for Sorted Weights
+def _package_merge(weights, max_len):
+    """
+    Optimal code lengths no longer than max_len (package-merge) for weights
+    sorted in ascending order.
+    """
+    n = len(weights)
+    leaves = [(w, (i,)) for i, w in enumerate(weights)]
+    items = leaves
+    for _ in range(max_len - 1):
+        packages = [(items[i][0] + items[i + 1][0], items[i][1] + items[i + 1][1])
+                    for i in range(0, len(items) - 1, 2)]
+        items = sorted(leaves + packages, key=lambda item: item[0])
+    lengths = [0] * n
+    for _, members in items[:2 * n - 2]:
+        for i in members:
+            lengths[i] += 1
+    return lengths
+
+# Huffman Code Lengths from Frequencies
+def huffman_lengths(freq, max_len=MAX_CODE_LEN):
+    """
+    {symbol: code length} for a 256-entry frequency array, limited to max_len
+    bits. Symbols with zero count get no code.
+    """
+    symbols = np.flatnonzero(freq)
+    if len(symbols) == 0:
+        return {}
+    if len(symbols) == 1:
+        return {int(symbols[0]): 1}
+    order = symbols[np.argsort(freq[symbols], kind='stable')]
+    weights = freq[order].tolist()
+    lengths = _minimum_redundancy(weights)
+    if lengths[0] > max_len:  # the rarest symbol has the longest code
+        lengths = _package_merge(weights, max_len)
+    return dict(zip(order.tolist(), lengths))
+
+# Code Lengths of a Codebook
+def code_lengths(codes):
+    return {sym: len(code) for sym, code in codes.items()}
+
+# Canonical Codes from Code Lengths
+def canonical_codes(lengths):
+    """
+    Assign canonical Huffman codes from {symbol: length}: codes of equal length
+    are consecutive integers in symbol order, so the lengths alone fully
+    describe the codebook.
+    """
+    codes = {}
+    code = 0
+    prev_len = 0
+    for length, sym in sorted((length, sym) for sym, length in lengths.items() if length):
+        code <<= length - prev_len
+        codes[sym] = format(code, f"0{length}b")
+        code += 1
+        prev_len = length
+    return codes
+
+# Check Whether a Codebook Is Canonical
+def is_canonical(codes):
+    return codes == canonical_codes(code_lengths(codes))
 
 # Compress Function
 def compress(data):
@@ -48,43 +147,544 @@ def compress(data):
     if not data:
         return b'', {}, 0
 
-    root = build_tree(data)
-    codes = build_codes(root)
-    encoded_bits = ''.join(codes[b] for b in data)
+    freq = count_frequencies(data)
+    lengths = huffman_lengths(freq)
+    codes = canonical_codes(lengths)
+
+    total_bits = sum(length * int(freq[sym]) for sym, length in lengths.items())
+    extra = 8 - total_bits % 8  # pad to make length multiple of 8
+    return pack_codes(data, codes, total_bits + extra), codes, extra
+
+# Pack Codewords into Bytes
+def pack_codes(data, codes, nbits_out):
+    """
+    Write the codeword of every input byte into a preallocated buffer of
+    nbits_out bits (zero padded at the end), using an integer accumulator
+    flushed 64 bits at a time.
+    """
+    lengths = [0] * 256
+    values = [0] * 256
+    for sym, code in codes.items():
+        lengths[sym] = len(code)
+        values[sym] = int(code, 2)
+
+    out = bytearray(nbits_out // 8)
+    acc = 0
+    nbits = 0
+    pos = 0
+    for byte in data:
+        acc = (acc << lengths[byte]) | values[byte]
+        nbits += lengths[byte]
+        if nbits >= 64:
+            nbits -= 64
+            out[pos:pos + 8] = (acc >> nbits).to_bytes(8, 'big')
+            acc &= (1 << nbits) - 1
+            pos += 8
 
-    # Pad to make length multiple of 8
-    extra = 8 - len(encoded_bits) % 8
-    encoded_bits += '0' * extra
+    # Flush the tail, left-aligned in the remaining (padded) bytes
+    tail = len(out) - pos
+    out[pos:] = (acc << (tail * 8 - nbits)).to_bytes(tail, 'big')
+    return out
 
-    encoded_bytes = bytearray()
-    for i in range(0, len(encoded_bits), 8):
-        encoded_bytes.append(int(encoded_bits[i:i+8], 2))
-    return bytes(encoded_bytes), codes, extra
+# Width of the first-level decode table; longer codes spill into sub-tables
+LOOKUP_BITS = 12
+
+# Build Decode Tables from Codebook
+def build_decode_tables(codes):
+    """
+    Turn a codebook {symbol: '0101..'} into lookup tables indexed by integer
+    bit windows. Codes are brought into (length, integer) form once, so the
+    decoder never touches bit strings.
+    Returns (root, subtables, root_bits, max_len).
+    root[i] is (symbol, length), or (subtable index, -1) for codes longer
+    than root_bits; subtables[j] is (table, shift, mask).
+    """
+    entries = [(len(code), int(code, 2), sym) for sym, code in codes.items() if code]
+    max_len = max((length for length, _, _ in entries), default=0)
+    root_bits = min(max_len, LOOKUP_BITS)
+    root = [None] * (1 << root_bits)
+    subtables = []
+
+    long_codes = defaultdict(list)
+    for length, code, sym in entries:
+        if length <= root_bits:
+            base = code << (root_bits - length)
+            for i in range(base, base + (1 << (root_bits - length))):
+                root[i] = (sym, length)
+        else:
+            long_codes[code >> (length - root_bits)].append((length, code, sym))
+
+    for prefix, group in long_codes.items():
+        sub_bits = max(length for length, _, _ in group) - root_bits
+        table = [None] * (1 << sub_bits)
+        for length, code, sym in group:
+            tail = code & ((1 << (length - root_bits)) - 1)
+            base = tail << (root_bits + sub_bits - length)
+            for i in range(base, base + (1 << (root_bits + sub_bits - length))):
+                table[i] = (sym, length)
+        root[prefix] = (len(subtables), -1)
+        subtables.append((table, max_len - root_bits - sub_bits, (1 << sub_bits) - 1))
+    return root, subtables, root_bits, max_len
+
+# Decode Function
+def decode_bytes(encoded_bytes, codes, extra):
+    """
+    Decode a Huffman bit stream with the given codebook and padding bits.
+    Returns the raw decoded bytes.
+    """
+    if not encoded_bytes or not codes:
+        return b""
+    return b"".join(decode_stream((encoded_bytes,), codes, extra))
+
+def _unknown_code():
+    return ValueError("Bit stream contains a code that is not in the codebook.")
+
+def decode_stream(chunks, codes, extra):
+    """
+    decode_bytes() over an iterable of encoded chunks; yields the decoded
+    bytes of each chunk as it arrives. Only the last byte is held back,
+    since it carries the padding.
+    """
+    root, subtables, root_bits, max_len = build_decode_tables(codes)
+    if not max_len:
+        return
+    root_shift = max_len - root_bits
+    peek_mask = (1 << max_len) - 1
+    keep_mask = (1 << (max_len + 8)) - 1
+    acc = 0
+    nbits = 0
+    held = None
+    for chunk in chunks:
+        view = memoryview(chunk).cast('B')
+        if not len(view):
+            continue
+        body = view[:-1] if held is None else bytes((held,)) + view[:-1]
+        held = view[-1]
+        output = bytearray()
+        # All padding lives in the last byte, so every earlier bit is payload
+        for byte in body:
+            acc = ((acc << 8) | byte) & keep_mask
+            nbits += 8
+            while nbits >= max_len:
+                window = (acc >> (nbits - max_len)) & peek_mask
+                entry = root[window >> root_shift]
+                if entry is None:
+                    raise _unknown_code()
+                sym, length = entry
+                if length < 0:
+                    table, shift, mask = subtables[sym]
+                    entry = table[(window >> shift) & mask]
+                    if entry is None:
+                        raise _unknown_code()
+                    sym, length = entry
+                output.append(sym)
+                nbits -= length
+        yield bytes(output)
+    if held is None:
+        return
+
+    # Tail: drop the padding bits, then decode whatever complete codes remain
+    output = bytearray()
+    last_bits = 8 - extra
+    acc = (acc << last_bits) | (held >> extra)
+    nbits += last_bits
+    while nbits > 0:
+        if nbits >= max_len:
+            window = (acc >> (nbits - max_len)) & peek_mask
+        else:
+            window = (acc << (max_len - nbits)) & peek_mask
+        entry = root[window >> root_shift]
+        if entry is None:
+            raise _unknown_code()
+        sym, length = entry
+        if length < 0:
+            table, shift, mask = subtables[sym]
+            entry = table[(window >> shift) & mask]
+            if entry is None:
+                raise _unknown_code()
+            sym, length = entry
+        if length > nbits:
+            break
+        output.append(sym)
+        nbits -= length
+    yield bytes(output)
+
+# Return Text When Possible
+def _text_or_bytes(output):
+    try:
+        return output.decode('utf-8')  # for text
+    except UnicodeDecodeError:
+        return output  # for binary/image files
 
 # Decompress Function
 def decompress(encoded_bytes, codes, extra):
     """
     Decompress using provided Huffman codebook and padding bits.
-    Returns original text (UTF-8 string).
+    Returns original text (UTF-8 string), or bytes for binary data.
     """
     if not encoded_bytes or not codes:
         return ""
+    return _text_or_bytes(decode_bytes(encoded_bytes, codes, extra))
+
+
+# =============================
+# === COMPRESSION BYPASS ===
+# =============================
+
+# Payload modes recorded in the metadata
+MODE_HUFFMAN = 0
+MODE_STORED = 1
+
+# Compress only if Huffman is expected to save at least this fraction
+MIN_SAVING = 0.02
+
+# Sampling for the estimate: SAMPLE_SLICES evenly spaced slices of SAMPLE_SLICE bytes
+SAMPLE_SLICES = 16
+SAMPLE_SLICE = 4096
+
 
-    # Reverse the codebook for decoding
-    rev = {v: k for k, v in codes.items()}
-    bits = ''.join(f"{byte:08b}" for byte in encoded_bytes)
-    bits = bits[:-extra] if extra else bits
-
-    buffer = ''
-    result = BytesIO()
-    for bit in bits:
-        buffer += bit
-        if buffer in rev:
-            result.write(bytes([rev[buffer]]))
-            buffer = ''
-    output = result.getvalue()
+def sample_bytes(data):
+    """A bounded, evenly spread sample of data (all of it when small)."""
+    n = len(data)
+    if n <= SAMPLE_SLICES * SAMPLE_SLICE:
+        return data
+    step = n // SAMPLE_SLICES
+    view = memoryview(data)
+    return b"".join(view[i * step:i * step + SAMPLE_SLICE] for i in range(SAMPLE_SLICES))
+
+
+def estimated_ratio(data):
+    """Expected compressed/original size, from Huffman code lengths of a sample."""
+    sample = sample_bytes(data)
+    if not sample:
+        return 1.0
+    freq = count_frequencies(sample)
+    lengths = huffman_lengths(freq)
+    bits = sum(length * int(freq[sym]) for sym, length in lengths.items())
+    return bits / (8 * len(sample))
+
+
+def choose_mode(data):
+    """MODE_STORED for already entropy-coded inputs (JPEG, ciphertext...), else MODE_HUFFMAN."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if estimated_ratio(data) > 1 - MIN_SAVING:
+        return MODE_STORED
+    return MODE_HUFFMAN
+
+
+# =============================
+# === BLOCK MODE (PARALLEL) ===
+# =============================
+
+# Input bytes per independently coded block
+BLOCK_SIZE = 1 << 20
+
+
+def _compress_block(block):
+    encoded, codes, extra = compress(block)
+    return encoded, code_lengths(codes), extra
+
+
+def _decode_block(args):
+    encoded, lengths, extra = args
+    return decode_bytes(encoded, canonical_codes(lengths), extra)
+
+
+def _map_blocks(fn, items, workers):
+    """Run fn over items in order, in a process pool when there is more than one item."""
+    if workers == 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items))
+
+
+def compress_blocks(data, block_size=BLOCK_SIZE, workers=None):
+    """
+    Split data into block_size pieces and Huffman-code each with its own
+    table, in parallel across a process pool (workers=None: one per core).
+    Returns (compressed_bytes, blocks) where blocks is a list of
+    (compressed_size, code_lengths, extra) in stream order.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    view = memoryview(data)
+    pieces = [view[i:i + block_size].tobytes() for i in range(0, len(data), block_size)]
+    results = _map_blocks(_compress_block, pieces, workers)
+    blocks = [(len(encoded), lengths, extra) for encoded, lengths, extra in results]
+    return b"".join(encoded for encoded, _, _ in results), blocks
+
+
+def decompress_blocks(compressed, blocks, workers=None):
+    """Inverse of compress_blocks(); blocks are decoded in parallel."""
+    view = memoryview(compressed)
+    jobs = []
+    offset = 0
+    for size, lengths, extra in blocks:
+        jobs.append((view[offset:offset + size].tobytes(), lengths, extra))
+        offset += size
+    return _text_or_bytes(b"".join(_map_blocks(_decode_block, jobs, workers)))
+
+
+def decompress_blocks_stream(chunks, blocks, workers=None):
+    """
+    Streaming decompress_blocks(): yields the decoded bytes block by block
+    for an iterable of compressed chunks. Blocks are decoded in batches of
+    one per worker, so at most one batch is held in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(blocks) > 1 else None
     try:
-        return output.decode('utf-8')  # for text
-    except UnicodeDecodeError:
-        return output  # for binary/image files
+        pending = bytearray()
+        batch = []
+        index = 0
+        for chunk in chunks:
+            pending += chunk
+            while index < len(blocks) and len(pending) >= blocks[index][0]:
+                size, lengths, extra = blocks[index]
+                batch.append((bytes(pending[:size]), lengths, extra))
+                del pending[:size]
+                index += 1
+                if len(batch) == workers:
+                    yield from (pool.map(_decode_block, batch) if pool else map(_decode_block, batch))
+                    batch = []
+        if index < len(blocks):
+            raise ValueError("Compressed stream ended before its last block.")
+        yield from (pool.map(_decode_block, batch) if pool else map(_decode_block, batch))
+    finally:
+        if pool:
+            pool.shutdown()
+
+
+# =============================
+# === ONE-PASS ADAPTIVE HUFFMAN (FGK) ===
+# =============================
+
+# Bytes read or written per I/O call by AdaptiveHuffman
+CHUNK_SIZE = 64 * 1024
+
+# Escaped symbols are sent raw in 9 bits: 0..255 are bytes, 256 ends the stream
+_RAW_BITS = 9
+_EOF = 256
+
+
+def _open_stream(src, mode):
+    """Return (file object, should_close) for a path or an already open file."""
+    if isinstance(src, (str, os.PathLike)):
+        return open(src, mode), True
+    return src, False
+
+
+class AdaptiveHuffman:
+    """
+    One-pass adaptive Huffman coder (FGK algorithm).
+    Encoder and decoder start from the same empty tree and update it after
+    every symbol, so no frequency pass and no codebook are needed. Symbols not
+    seen before are sent as the NYT (not-yet-transmitted) code followed by the
+    raw 9-bit symbol; symbol 256 marks the end of the stream.
+    Input and output are processed in CHUNK_SIZE pieces, so inputs larger than
+    RAM can be compressed.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Node arrays; node 0 is the root, which starts out as the NYT leaf.
+        # order lists node ids by decreasing node number (root first), so
+        # weights are non-increasing along it (sibling property).
+        self.weight = [0]
+        self.parent = [-1]
+        self.left = [-1]
+        self.right = [-1]
+        self.order = [0]
+        self.rank = [0]
+        self.leaf = {}
+        self.symbol = [None]
+        self.nyt = 0
+
+    # --- tree maintenance ---
+
+    def _new_node(self, parent, sym=None):
+        node = len(self.weight)
+        self.weight.append(0)
+        self.parent.append(parent)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.symbol.append(sym)
+        self.rank.append(len(self.order))
+        self.order.append(node)
+        return node
+
+    def _split_nyt(self, sym):
+        """Give the NYT node two children: a new NYT and the leaf for sym."""
+        old = self.nyt
+        leaf = self._new_node(old, sym)
+        self.nyt = self._new_node(old)
+        self.left[old] = self.nyt
+        self.right[old] = leaf
+        self.leaf[sym] = leaf
+        return leaf
+
+    def _swap(self, a, b):
+        parent, left, right, order, rank = self.parent, self.left, self.right, self.order, self.rank
+        pa, pb = parent[a], parent[b]
+        if pa == pb:
+            left[pa], right[pa] = right[pa], left[pa]
+        else:
+            if left[pa] == a:
+                left[pa] = b
+            else:
+                right[pa] = b
+            if left[pb] == b:
+                left[pb] = a
+            else:
+                right[pb] = a
+            parent[a], parent[b] = pb, pa
+        ra, rb = rank[a], rank[b]
+        order[ra], order[rb] = b, a
+        rank[a], rank[b] = rb, ra
+
+    def _update(self, sym):
+        weight, parent, order, rank = self.weight, self.parent, self.order, self.rank
+        q = self.leaf.get(sym)
+        if q is None:
+            q = self._split_nyt(sym)
+        while q != 0:
+            # Highest-numbered node of q's weight; never q's own parent
+            w = weight[q]
+            i = rank[q]
+            while i > 0 and weight[order[i - 1]] == w:
+                i -= 1
+            leader = order[i]
+            if leader == parent[q]:
+                leader = order[i + 1]
+            if leader != q:
+                self._swap(q, leader)
+            weight[q] = w + 1
+            q = parent[q]
+        weight[0] += 1
+
+    def _code(self, node):
+        """(code, length) of the path from the root to node."""
+        parent, right = self.parent, self.right
+        code = 0
+        length = 0
+        while node != 0:
+            p = parent[node]
+            if right[p] == node:
+                code |= 1 << length
+            length += 1
+            node = p
+        return code, length
+
+    # --- public API ---
+
+    def compress(self, src, dst, chunk_size=CHUNK_SIZE):
+        """Compress src (path or binary file object) into dst in one pass."""
+        self.reset()
+        fin, close_in = _open_stream(src, "rb")
+        fout, close_out = _open_stream(dst, "wb")
+        try:
+            acc = 0
+            nbits = 0
+            out = bytearray()
+            while True:
+                chunk = fin.read(chunk_size)
+                if not chunk:
+                    break
+                for sym in chunk:
+                    node = self.leaf.get(sym)
+                    if node is None:
+                        code, length = self._code(self.nyt)
+                        code = (code << _RAW_BITS) | sym
+                        length += _RAW_BITS
+                    else:
+                        code, length = self._code(node)
+                    acc = (acc << length) | code
+                    nbits += length
+                    if nbits >= 64:
+                        nbits -= 64
+                        out += (acc >> nbits).to_bytes(8, 'big')
+                        acc &= (1 << nbits) - 1
+                    self._update(sym)
+                if len(out) >= chunk_size:
+                    fout.write(out)
+                    out = bytearray()
+
+            code, length = self._code(self.nyt)
+            acc = (acc << (length + _RAW_BITS)) | (code << _RAW_BITS) | _EOF
+            nbits += length + _RAW_BITS
+            pad = -nbits % 8
+            out += (acc << pad).to_bytes((nbits + pad) // 8, 'big')
+            fout.write(out)
+        finally:
+            if close_in:
+                fin.close()
+            if close_out:
+                fout.close()
 
+    def expand(self, src, dst, chunk_size=CHUNK_SIZE):
+        """
+        Decompress src (path, binary file object, bytes, or an iterable of
+        byte chunks, e.g. a streaming decoder) into dst (path or binary file
+        object).
+        """
+        self.reset()
+        if isinstance(src, (bytes, bytearray, memoryview)):
+            src = BytesIO(src)
+        if isinstance(src, (str, os.PathLike)) or hasattr(src, "read"):
+            fin, close_in = _open_stream(src, "rb")
+            chunks = iter(lambda: fin.read(chunk_size), b"")
+        else:
+            close_in = False
+            chunks = iter(src)
+        fout, close_out = _open_stream(dst, "wb")
+        try:
+            left, right, symbol = self.left, self.right, self.symbol
+            out = bytearray()
+            node = 0
+            raw = _RAW_BITS  # bits left of an escaped symbol, -1 while walking the tree;
+                             # the first symbol is always escaped (the tree is just NYT)
+            value = 0
+            done = False
+            while not done:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    raise ValueError("Adaptive Huffman stream ended without an end marker.")
+                for byte in chunk:
+                    for shift in range(7, -1, -1):
+                        bit = (byte >> shift) & 1
+                        if raw >= 0:
+                            value = (value << 1) | bit
+                            raw -= 1
+                            if raw:
+                                continue
+                            raw = -1
+                            if value == _EOF:
+                                done = True
+                                break
+                            sym = value
+                        else:
+                            node = right[node] if bit else left[node]
+                            if left[node] != -1:
+                                continue
+                            if node == self.nyt:
+                                raw = _RAW_BITS
+                                value = 0
+                                node = 0
+                                continue
+                            sym = symbol[node]
+                        out.append(sym)
+                        self._update(sym)
+                        node = 0
+                    if done:
+                        break
+                if len(out) >= chunk_size or done:
+                    fout.write(out)
+                    out = bytearray()
+        finally:
+            if close_in:
+                fin.close()
+            if close_out:
+                fout.close()
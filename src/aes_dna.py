@@ -1,17 +1,29 @@
 # aes_dna.py
 import hashlib
 import base64
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from dna_codec import dna_to_codes
 
 # DNA-bit mappings
 _DNA_TO_BITS = {"A": "00", "G": "01", "C": "10", "T": "11"}
 _BITS_TO_DNA = {v: k for k, v in _DNA_TO_BITS.items()}
 
 
+# Bases indexed by their 2-bit value (same mapping as _DNA_TO_BITS)
+DNA_ALPHABET = "AGCT"
+
+
 def dna_to_bitstring(dna_seq: str) -> str:
-    """Convert DNA sequence (A, G, C, T) into a bit string."""
-    return "".join(_DNA_TO_BITS[c] for c in dna_seq.strip().upper() if c in _DNA_TO_BITS)
+    """Convert DNA sequence (A, G, C, T) into a bit string; other symbols are skipped."""
+    codes, _ = dna_to_codes(dna_seq.upper(), DNA_ALPHABET)
+    bits = np.stack([codes >> 1, codes & 1], axis=1) + ord("0")
+    return bits.astype(np.uint8).tobytes().decode("ascii")
 
 
 def bitstring_to_bytes(bitstr: str) -> bytes:
@@ -27,17 +39,77 @@ def bytes_to_bitstring(b: bytes) -> str:
     return "".join(f"{byte:08b}" for byte in b)
 
 
+def _derive_key(dna_file_path: str, key_bytes: int) -> bytes:
+    dna = open(dna_file_path, "r").read().strip().upper()
+    bitstr = dna_to_bitstring(dna)
+    digest = hashlib.sha256(bitstr.encode()).digest()
+    return digest[:key_bytes]  # AES-256
+
+
+# =============================
+# === KEY MATERIAL CACHE ===
+# =============================
+# Derived keys are cached per DNA file, keyed on (path, mtime, size) so an
+# edited or replaced file is derived again. Keys live in bytearrays that are
+# overwritten with zeros when evicted or invalidated. Every DNA-derived key
+# goes through it, including the KEKs envelope.py unwraps data keys with.
+
+KEY_CACHE_SIZE = 16
+
+_key_cache = OrderedDict()  # (path, key_bytes) -> ((mtime_ns, size), bytearray key)
+_cache_lock = threading.Lock()
+
+
+def _zeroize(buf: bytearray):
+    buf[:] = bytes(len(buf))
+
+
+def _file_state(dna_file_path: str):
+    if not os.path.isfile(dna_file_path):
+        raise FileNotFoundError(f"DNA file not found: {dna_file_path}")
+    path = os.path.realpath(dna_file_path)
+    st = os.stat(path)
+    return path, (st.st_mtime_ns, st.st_size)
+
+
+def _cached_key(dna_file_path: str, key_bytes: int):
+    """
+    Returns the key bytes, deriving on a miss or a stale entry.
+    The key is copied out while the lock is held: the cached bytearray may
+    be zeroized by another thread (eviction, invalidation) right after.
+    """
+    path, stamp = _file_state(dna_file_path)
+    with _cache_lock:
+        entry = _key_cache.get((path, key_bytes))
+        if entry and entry[0] == stamp:
+            _key_cache.move_to_end((path, key_bytes))
+            return bytes(entry[1])
+    key = bytearray(_derive_key(path, key_bytes))
+    with _cache_lock:
+        old = _key_cache.pop((path, key_bytes), None)
+        if old:
+            _zeroize(old[1])
+        _key_cache[(path, key_bytes)] = (stamp, key)
+        while len(_key_cache) > KEY_CACHE_SIZE:
+            _, (_, evicted) = _key_cache.popitem(last=False)
+            _zeroize(evicted)
+        return bytes(key)
+
+
 def derive_aes_key_from_dna_file(dna_file_path: str, key_bytes: int = 32) -> bytes:
     """
     Derive AES key (default 256-bit) from a physical DNA sequence file.
     The DNA file contains ACTG characters; it’s hashed using SHA-256 to produce the key.
+    Results are cached until the file changes (see invalidate_key_cache).
     """
-    if not os.path.isfile(dna_file_path):
-        raise FileNotFoundError(f"DNA file not found: {dna_file_path}")
-    dna = open(dna_file_path, "r").read().strip().upper()
-    bitstr = dna_to_bitstring(dna)
-    digest = hashlib.sha256(bitstr.encode()).digest()
-    return digest[:key_bytes]  # AES-256
+    return _cached_key(dna_file_path, key_bytes)
+
+def invalidate_key_cache(dna_file_path: str = None):
+    """Drop (and zeroize) cached key material for one DNA file, or for all when no path is given."""
+    path = os.path.realpath(dna_file_path) if dna_file_path is not None else None
+    with _cache_lock:
+        for ident in [i for i in _key_cache if path is None or i[0] == path]:
+            _zeroize(_key_cache.pop(ident)[1])
 
 
 def encrypt_bytes(plaintext: bytes, key: bytes) -> dict:
@@ -57,6 +129,24 @@ def decrypt_bytes(ciphertext: bytes, nonce: bytes, key: bytes) -> bytes:
     return aesgcm.decrypt(nonce, ciphertext, None)
 
 
+def decrypt_bytes_stream(chunks, nonce: bytes, key: bytes):
+    """
+    decrypt_bytes() over an iterable of chunks of ciphertext || tag; yields
+    plaintext chunks. The tag is checked after the last chunk (InvalidTag).
+    """
+    decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce)).decryptor()
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        # The trailing 16 bytes may be the tag: hold them back
+        if len(pending) > 16:
+            yield decryptor.update(pending[:-16])
+            pending = pending[-16:]
+    if len(pending) < 16:
+        raise InvalidTag()
+    yield decryptor.finalize_with_tag(pending)
+
+
 def nonce_to_b64(nonce: bytes) -> str:
     return base64.b64encode(nonce).decode()
 
@@ -0,0 +1,263 @@
+# aes_stream.py
+"""
+Segmented AES-GCM (the STREAM construction) for inputs of any size.
+
+The plaintext is cut into fixed-size segments, each sealed on its own with
+AES-GCM, so memory stays at one segment and decryption emits plaintext as
+soon as a segment has arrived and verified.
+
+Layout:
+  header  = b"DNAS" | version (1) | segment size (4, big-endian) | nonce prefix (7)
+  segment = AES-GCM(key, nonce_i, plaintext_i, aad=header)   (plaintext_i + 16-byte tag)
+  nonce_i = prefix (7) | i (4, big-endian) | last flag (1)
+
+Every segment but the last holds exactly segment-size bytes of plaintext;
+the last may be shorter (or empty) and is the only one sealed with the flag
+set. Reordered segments fail their tag (wrong counter), and a stream cut at
+a segment boundary fails too (its final segment was not sealed as last).
+
+Segments are independent, so in-memory buffers can also be sealed and
+opened across a thread pool (encrypt_parallel/decrypt_parallel: AESGCM
+releases the GIL); the output is byte-identical to the streaming functions.
+Everywhere a key is taken, an AESGCM context may be passed instead, so
+callers can reuse one across calls.
+"""
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"DNAS"
+VERSION = 1
+SEGMENT_SIZE = 1 << 20
+PREFIX_SIZE = 7
+TAG_SIZE = 16
+MAX_SEGMENTS = 1 << 32
+
+# Payload authentication recorded in key files: one AES-GCM call, or this module
+AEAD_GCM = 0
+AEAD_STREAM = 1
+
+_HEADER = struct.Struct(">4sBI7s")
+HEADER_SIZE = _HEADER.size
+
+
+class _ChunkReader:
+    """Minimal read() over an iterable of byte chunks (e.g. a streaming decoder)."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = memoryview(b"")
+
+    def read(self, n: int) -> bytes:
+        while not len(self._buf):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b""
+            self._buf = memoryview(chunk).cast("B")
+        out, self._buf = self._buf[:n], self._buf[n:]
+        return bytes(out)
+
+
+def _open_reader(src):
+    """
+    Return (file object, should_close) for a path, bytes, an open binary
+    file, or an iterable of byte chunks.
+    """
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        return BytesIO(src), False
+    if isinstance(src, (str, os.PathLike)):
+        return open(src, "rb"), True
+    if hasattr(src, "read"):
+        return src, False
+    return _ChunkReader(src), False
+
+
+def _aead(key):
+    """key may be raw key bytes or an already constructed AESGCM context (reused as is)."""
+    return key if isinstance(key, AESGCM) else AESGCM(key)
+
+
+def _read_exact(f, n: int) -> bytes:
+    """Read up to n bytes, looping over short reads (pipes, sockets)."""
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = f.read(n - len(buf))
+        if not chunk:
+            break
+        buf += chunk
+    return bytes(buf)
+
+
+def pack_header(segment_size: int, prefix: bytes) -> bytes:
+    return _HEADER.pack(MAGIC, VERSION, segment_size, prefix)
+
+
+def unpack_header(header: bytes):
+    """Returns (segment size, nonce prefix); raises ValueError if header is not a STREAM header."""
+    if len(header) < HEADER_SIZE:
+        raise ValueError("Truncated AES stream header.")
+    magic, version, segment_size, prefix = _HEADER.unpack_from(header, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an AES stream (bad magic).")
+    if version > VERSION:
+        raise ValueError(f"Unsupported AES stream version: {version}")
+    if segment_size <= 0:
+        raise ValueError("Invalid AES stream segment size.")
+    return segment_size, prefix
+
+
+def segment_nonce(prefix: bytes, index: int, last: bool) -> bytes:
+    if index >= MAX_SEGMENTS:
+        raise OverflowError("AES stream segment counter exhausted.")
+    return prefix + index.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+
+def encrypt_stream(src, key: bytes, segment_size: int = SEGMENT_SIZE):
+    """
+    Encrypt src (path, bytes, binary file object, or iterable of chunks)
+    segment by segment.
+    Yields the header, then each sealed segment.
+    """
+    fin, close_in = _open_reader(src)
+    try:
+        aesgcm = _aead(key)
+        header = pack_header(segment_size, os.urandom(PREFIX_SIZE))
+        _, prefix = unpack_header(header)
+        yield header
+        index = 0
+        segment = _read_exact(fin, segment_size)
+        while True:
+            # Read one segment ahead: only the last one is sealed with the flag
+            following = _read_exact(fin, segment_size) if len(segment) == segment_size else b""
+            last = not following
+            yield aesgcm.encrypt(segment_nonce(prefix, index, last), segment, header)
+            if last:
+                return
+            segment = following
+            index += 1
+    finally:
+        if close_in:
+            fin.close()
+
+
+def decrypt_stream(src, key: bytes):
+    """
+    Decrypt a stream written by encrypt_stream(); yields plaintext segments
+    as soon as each one is read and authenticated. Raises InvalidTag on a
+    modified, reordered or truncated stream, ValueError on a bad header.
+    """
+    fin, close_in = _open_reader(src)
+    try:
+        aesgcm = _aead(key)
+        header = _read_exact(fin, HEADER_SIZE)
+        segment_size, prefix = unpack_header(header)
+        sealed_size = segment_size + TAG_SIZE
+        index = 0
+        sealed = _read_exact(fin, sealed_size)
+        while True:
+            following = _read_exact(fin, sealed_size) if len(sealed) == sealed_size else b""
+            last = not following
+            if len(sealed) < TAG_SIZE:
+                raise InvalidTag()
+            yield aesgcm.decrypt(segment_nonce(prefix, index, last), sealed, header)
+            if last:
+                return
+            sealed = following
+            index += 1
+    finally:
+        if close_in:
+            fin.close()
+
+
+def _segments(data, segment_size: int):
+    """Zero-copy segment views of data; always at least one (possibly empty) segment."""
+    view = memoryview(data).cast("B")
+    return [view[i:i + segment_size] for i in range(0, len(view), segment_size)] or [view]
+
+
+def _run(fn, count: int, workers):
+    """fn(0..count-1) across a thread pool, inline when there is only one segment or worker."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or count == 1:
+        return [fn(i) for i in range(count)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, range(count)))
+
+
+def encrypt_parallel(data, key: bytes, segment_size: int = SEGMENT_SIZE, workers=None, prefix=None) -> bytearray:
+    """
+    encrypt_stream() for an in-memory buffer, sealing segments across a
+    thread pool (workers=None: one per core). Each thread writes straight
+    into its slot of the output, so the result is in segment order and, for
+    a given prefix, deterministic.
+    """
+    aesgcm = _aead(key)
+    header = pack_header(segment_size, prefix or os.urandom(PREFIX_SIZE))
+    _, prefix = unpack_header(header)
+    segments = _segments(data, segment_size)
+    last = len(segments) - 1
+    out = bytearray(HEADER_SIZE + sum(len(seg) for seg in segments) + TAG_SIZE * len(segments))
+    out[:HEADER_SIZE] = header
+    view = memoryview(out)
+
+    def seal(i):
+        start = HEADER_SIZE + i * (segment_size + TAG_SIZE)
+        slot = view[start:start + len(segments[i]) + TAG_SIZE]
+        nonce = segment_nonce(prefix, i, i == last)
+        if hasattr(aesgcm, "encrypt_into"):
+            aesgcm.encrypt_into(nonce, segments[i], header, slot)
+        else:  # older cryptography releases
+            slot[:] = aesgcm.encrypt(nonce, segments[i], header)
+
+    _run(seal, len(segments), workers)
+    return out
+
+
+def decrypt_parallel(blob, key: bytes, workers=None) -> bytearray:
+    """Inverse of encrypt_parallel() (or of a joined encrypt_stream()), opening segments across a thread pool."""
+    aesgcm = _aead(key)
+    view = memoryview(blob).cast("B")
+    header = bytes(view[:HEADER_SIZE])
+    segment_size, prefix = unpack_header(header)
+    segments = _segments(view[HEADER_SIZE:], segment_size + TAG_SIZE)
+    last = len(segments) - 1
+    if len(segments[last]) < TAG_SIZE:
+        raise InvalidTag()
+    out = bytearray(sum(len(seg) for seg in segments) - TAG_SIZE * len(segments))
+    out_view = memoryview(out)
+
+    def open_segment(i):
+        start = i * segment_size
+        slot = out_view[start:start + len(segments[i]) - TAG_SIZE]
+        nonce = segment_nonce(prefix, i, i == last)
+        if hasattr(aesgcm, "decrypt_into"):
+            aesgcm.decrypt_into(nonce, segments[i], header, slot)
+        else:  # older cryptography releases
+            slot[:] = aesgcm.decrypt(nonce, segments[i], header)
+
+    _run(open_segment, len(segments), workers)
+    return out
+
+
+def encrypt_file(src: str, dst: str, key: bytes, segment_size: int = SEGMENT_SIZE):
+    with open(dst, "wb") as fout:
+        for piece in encrypt_stream(src, key, segment_size):
+            fout.write(piece)
+
+
+def decrypt_file(src: str, dst: str, key: bytes):
+    """
+    Decrypt src into dst. Segments are written as they verify; dst is
+    removed again if a later segment fails.
+    """
+    try:
+        with open(dst, "wb") as fout:
+            for piece in decrypt_stream(src, key):
+                fout.write(piece)
+    except (InvalidTag, ValueError):
+        os.remove(dst)
+        raise
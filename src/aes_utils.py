@@ -1,5 +1,6 @@
 # aes_utils.py
 import os
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 def aes_encrypt(plaintext):
@@ -26,3 +27,14 @@ def aes_decrypt(ciphertext: bytes, key: bytes, nonce: bytes, tag: bytes):
     ct_and_tag = ciphertext + tag
     plaintext = aesgcm.decrypt(nonce, ct_and_tag, associated_data=None)
     return plaintext
+
+def aes_decrypt_stream(chunks, key: bytes, nonce: bytes, tag: bytes):
+    """
+    aes_decrypt() over an iterable of ciphertext chunks; yields plaintext chunks.
+    The tag is only checked once the last chunk is in (InvalidTag is raised
+    then), so callers must not publish the output before the stream ends.
+    """
+    decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce, tag)).decryptor()
+    for chunk in chunks:
+        yield decryptor.update(chunk)
+    yield decryptor.finalize()
@@ -0,0 +1,274 @@
+# batch.py
+"""
+Batch encryption of many short records into one packed output.
+
+Setup is paid once per batch instead of once per record: one shared
+(canonical) Huffman codebook, one data key and AESGCM context with
+counter nonces, one Reed-Solomon codec run over the whole sealed stream,
+and a single 2-bit packed DNA payload (dna_codec .2bit record).
+
+Output layout:
+  b"DNAB" | version (1) | flags (1) | nsym (1) | reserved (1) | index length (4) | index | .2bit record
+  index = key length (1) | key (wrapped or raw)
+          | DNA key file length (2) | DNA key file (utf-8; version 2+) | nonce prefix (4)
+          | code-length count (2) | code lengths | record count (4)
+          | per record: offset (8) | sealed length (4) | padding bits (1)
+
+Record i is sealed with nonce prefix | i (8 bytes, big-endian) at byte
+offset "offset" of the RS message stream, so a single record can be read
+back by correcting only the codewords that cover it (BatchReader[i]).
+The DNA key file names the sequence whose KEK wrapped the key (relative to
+the repository root unless absolute); envelope.py rewrap rotates it along
+with the wrapped key.
+
+CLI:
+  python batch.py encrypt <records.txt> <out.dnab>   (one record per line)
+  python batch.py decrypt <in.dnab> <out.txt>
+"""
+import os
+import struct
+import sys
+
+import numpy as np
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from adaptiveHuffman import (
+    MODE_STORED,
+    canonical_codes,
+    choose_mode,
+    count_frequencies,
+    decode_bytes,
+    huffman_lengths,
+    pack_codes,
+)
+from dna_codec import packed_from_bytes, read_packed
+from ecc_utils import rs_decode_batch, rs_encode_batch
+from envelope import kek_from_dna_file, new_data_key, unwrap_key, wrap_key
+from utils import BASE_DIR, DNA_KEY_PATH
+
+MAGIC = b"DNAB"
+VERSION = 2
+FLAG_WRAPPED_KEY = 1
+FLAG_HUFFMAN = 2
+
+NSYM = 32
+NSIZE = 255
+PREFIX_SIZE = 4
+
+_HEADER = struct.Struct(">4sBBBBI")
+_RECORD = struct.Struct(">QIB")
+
+
+def records_from_file(path: str):
+    """Records of a newline-delimited file, as bytes without the line ending."""
+    with open(path, "rb") as f:
+        for line in f:
+            yield line.rstrip(b"\r\n")
+
+
+def _code_tables(lengths: dict):
+    """(length array, codebook) for a {symbol: length} table."""
+    length_arr = np.zeros(256, dtype=np.int64)
+    for sym, length in lengths.items():
+        length_arr[sym] = length
+    return length_arr, canonical_codes(lengths)
+
+
+def _compress_record(record: bytes, codes, length_arr):
+    """Huffman-code one record with the shared codebook; returns (bytes, padding bits)."""
+    if not record:
+        return b"", 0
+    total_bits = int(length_arr[np.frombuffer(record, dtype=np.uint8)].sum())
+    extra = 8 - total_bits % 8
+    return pack_codes(record, codes, total_bits + extra), extra
+
+
+def _read_key_fields(blob):
+    """
+    (flags, key field, DNA key file or None, offset of the nonce prefix)
+    of a batch file; version 1 files name no DNA key file.
+    """
+    magic, version, flags, _, _, _ = _HEADER.unpack_from(blob, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a DNA batch file.")
+    if version > VERSION:
+        raise ValueError(f"Unsupported batch version: {version}")
+    pos = _HEADER.size
+    key_len = blob[pos]
+    key_field = bytes(blob[pos + 1:pos + 1 + key_len])
+    pos += 1 + key_len
+    dna_file = None
+    if version >= 2:
+        (name_len,) = struct.unpack_from(">H", blob, pos)
+        dna_file = bytes(blob[pos + 2:pos + 2 + name_len]).decode("utf-8") or None
+        pos += 2 + name_len
+    return flags, key_field, dna_file, pos
+
+
+def _key_index(key_field: bytes, dna_file) -> bytes:
+    name = (dna_file or "").encode("utf-8")
+    return b"".join([bytes((len(key_field),)), key_field, struct.pack(">H", len(name)), name])
+
+
+def is_batch_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def encrypt_batch(records, out_path: str, dna_key_path: str = DNA_KEY_PATH, nsym: int = NSYM) -> int:
+    """
+    Encrypt an iterable of records (bytes or str) into out_path.
+    The data key is wrapped with the KEK of dna_key_path (envelope.py);
+    dna_key_path=None stores the data key itself instead.
+    Raises FileNotFoundError if dna_key_path does not exist.
+    Returns the number of records.
+    """
+    if dna_key_path is not None and not os.path.isfile(dna_key_path):
+        raise FileNotFoundError(f"DNA key file not found: {dna_key_path}\nCreate it with your DNA key sequence.")
+    records = [r.encode("utf-8") if isinstance(r, str) else bytes(r) for r in records]
+    joined = b"".join(records)
+
+    flags = 0
+    lengths = {}
+    if choose_mode(joined) != MODE_STORED:
+        # One codebook for the whole batch: per-record tables would outweigh short records
+        flags |= FLAG_HUFFMAN
+        lengths = huffman_lengths(count_frequencies(joined))
+    length_arr, codes = _code_tables(lengths)
+
+    data_key = new_data_key()
+    aead = AESGCM(data_key)
+    prefix = os.urandom(PREFIX_SIZE)
+    sealed = bytearray()
+    entries = []
+    for i, record in enumerate(records):
+        if flags & FLAG_HUFFMAN:
+            body, extra = _compress_record(record, codes, length_arr)
+        else:
+            body, extra = record, 0
+        ct = aead.encrypt(prefix + i.to_bytes(8, "big"), body, None)
+        entries.append(_RECORD.pack(len(sealed), len(ct), extra))
+        sealed += ct
+
+    dna_file = None
+    if dna_key_path is not None:
+        flags |= FLAG_WRAPPED_KEY
+        key_field = wrap_key(kek_from_dna_file(dna_key_path), data_key)
+        dna_file = os.path.relpath(dna_key_path, BASE_DIR)
+    else:
+        key_field = data_key
+    packed_lengths = bytes(length_arr.astype(np.uint8)).rstrip(b"\x00")
+    index = b"".join([
+        _key_index(key_field, dna_file), prefix,
+        struct.pack(">H", len(packed_lengths)), packed_lengths,
+        struct.pack(">I", len(records)),
+    ] + entries)
+
+    payload = packed_from_bytes(rs_encode_batch(sealed, nsym, NSIZE))
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, flags, nsym, 0, len(index)))
+        f.write(index)
+        f.write(payload)
+    return len(records)
+
+
+class BatchReader:
+    """
+    Random access to the records of a batch file; len(), [i] and iteration.
+    A wrapped data key is unwrapped with dna_key_path if given, else with
+    the DNA key file the batch names (DNA_KEY_PATH if it names none).
+    """
+
+    def __init__(self, path: str, dna_key_path: str = None):
+        with open(path, "rb") as f:
+            blob = f.read()
+        view = memoryview(blob)
+        flags, key_field, dna_file, pos = _read_key_fields(view)
+        _, _, _, nsym, _, index_len = _HEADER.unpack_from(view, 0)
+        self._prefix = bytes(view[pos:pos + PREFIX_SIZE])
+        pos += PREFIX_SIZE
+        (nlen,) = struct.unpack_from(">H", view, pos)
+        lengths = {sym: length for sym, length in enumerate(view[pos + 2:pos + 2 + nlen]) if length}
+        pos += 2 + nlen
+        (count,) = struct.unpack_from(">I", view, pos)
+        pos += 4
+        self._entries = [_RECORD.unpack_from(view, pos + i * _RECORD.size) for i in range(count)]
+
+        if flags & FLAG_WRAPPED_KEY:
+            if dna_key_path is None:
+                dna_key_path = dna_file or DNA_KEY_PATH
+                if not os.path.isabs(dna_key_path):
+                    dna_key_path = os.path.join(BASE_DIR, dna_key_path)
+            key_field = unwrap_key(kek_from_dna_file(dna_key_path), key_field)
+        self._aead = AESGCM(key_field)
+        self._codes = canonical_codes(lengths) if flags & FLAG_HUFFMAN else None
+        self._nsym = nsym
+        self._data_size = NSIZE - nsym
+        self._ecc, _, _ = read_packed(view[_HEADER.size + index_len:], verify=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _open(self, i: int, sealed) -> bytes:
+        body = self._aead.decrypt(self._prefix + i.to_bytes(8, "big"), bytes(sealed), None)
+        if self._codes is None:
+            return body
+        return decode_bytes(body, self._codes, self._entries[i][2])
+
+    def __getitem__(self, i: int) -> bytes:
+        """Decrypt record i, RS-correcting only the codewords it spans."""
+        if i < 0:
+            i += len(self)
+        offset, size, _ = self._entries[i]
+        first = offset // self._data_size
+        last = (offset + size - 1) // self._data_size if size else first
+        ecc = self._ecc[first * NSIZE:(last + 1) * NSIZE]
+        message = rs_decode_batch(ecc, self._nsym, NSIZE)
+        start = offset - first * self._data_size
+        return self._open(i, message[start:start + size])
+
+    def __iter__(self):
+        """All records in order, RS-correcting the whole stream once."""
+        message = rs_decode_batch(self._ecc, self._nsym, NSIZE)
+        for i, (offset, size, _) in enumerate(self._entries):
+            yield self._open(i, message[offset:offset + size])
+
+
+def decrypt_batch(path: str, dna_key_path: str = None):
+    return list(BatchReader(path, dna_key_path))
+
+
+def rewrap_batch_file(path: str, old_kek: bytes, new_kek: bytes, dna_file: str = None):
+    """
+    Re-wrap the data key of a batch file from old_kek to new_kek, in place
+    (envelope.rewrap_key_file() for .dnab files). A raw key gets wrapped;
+    dna_file is recorded as the new DNA key file. The payload is copied as is.
+    """
+    with open(path, "rb") as f:
+        blob = f.read()
+    flags, key_field, old_dna_file, pos = _read_key_fields(blob)
+    _, _, _, nsym, _, index_len = _HEADER.unpack_from(blob, 0)
+    data_key = unwrap_key(old_kek, key_field) if flags & FLAG_WRAPPED_KEY else key_field
+    key_index = _key_index(wrap_key(new_kek, data_key), dna_file or old_dna_file)
+    index = key_index + blob[pos:_HEADER.size + index_len]
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, flags | FLAG_WRAPPED_KEY, nsym, 0, len(index)))
+        f.write(index)
+        f.write(memoryview(blob)[_HEADER.size + index_len:])
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("encrypt", "decrypt"):
+        print(__doc__)
+        sys.exit(2)
+    if sys.argv[1] == "encrypt":
+        n = encrypt_batch(records_from_file(sys.argv[2]), sys.argv[3])
+        print(f"Encrypted {n} records into {sys.argv[3]}")
+    else:
+        with open(sys.argv[3], "wb") as f:
+            for record in BatchReader(sys.argv[2]):
+                f.write(record + b"\n")
+        print(f"Decrypted records saved to {sys.argv[3]}")
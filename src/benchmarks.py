@@ -0,0 +1,274 @@
+# benchmarks.py
+"""
+Micro-benchmarks for the hot stages of the pipeline.
+Run from src/:  python benchmarks.py
+Each benchmark times the current implementation against the reference
+(previous) implementation kept below, on the sample files in the repo.
+"""
+import heapq
+import os
+import time
+import tracemalloc
+from collections import defaultdict
+from io import BytesIO
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from reedsolo import RSCodec
+
+from adaptiveHuffman import canonical_codes, compress, count_frequencies, decompress, huffman_lengths
+from aes_stream import decrypt_parallel, encrypt_parallel
+from dna_codec import bytes_to_dna, dna_to_bytes, gc_content, has_long_homopolymer, screen_oligos
+from ecc_rs import rs_encode
+from ecc_utils import get_codec, rs_decode_batch, rs_encode_batch
+from utils import BASE_DIR
+
+SAMPLES = [
+    os.path.join(BASE_DIR, "example", "test.jpg"),
+    os.path.join(BASE_DIR, "test.txt"),
+]
+CIPHER_SAMPLE = os.path.join(BASE_DIR, "cipher", "Cipher.txt")
+
+
+def _timeit(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# =============================
+# === REFERENCE IMPLEMENTATIONS ===
+# =============================
+
+class _Node:
+    def __init__(self, freq, symbol=None, left=None, right=None):
+        self.freq = freq
+        self.symbol = symbol
+        self.left = left
+        self.right = right
+
+    def __lt__(self, other):
+        return self.freq < other.freq
+
+
+def _reference_build_codes(data):
+    """Per-byte dict counting and Node-heap tree used before the array-based build."""
+    freq = defaultdict(int)
+    for byte in data:
+        freq[byte] += 1
+    heap = [_Node(f, s) for s, f in freq.items()]
+    heapq.heapify(heap)
+    while len(heap) > 1:
+        n1 = heapq.heappop(heap)
+        n2 = heapq.heappop(heap)
+        heapq.heappush(heap, _Node(n1.freq + n2.freq, left=n1, right=n2))
+    codes = {}
+    stack = [(heap[0], "")]
+    while stack:
+        node, prefix = stack.pop()
+        if node.symbol is not None:
+            codes[node.symbol] = prefix
+        else:
+            stack.append((node.left, prefix + "0"))
+            stack.append((node.right, prefix + "1"))
+    return codes
+
+
+def _reference_compress(data):
+    """Bit-string Huffman encoder used before the bit-packed one."""
+    return _reference_pack(data, _reference_build_codes(data))
+
+
+def _reference_compress_canonical(data):
+    """The bit-string encoder over compress()'s canonical code table: its output must match byte for byte."""
+    return _reference_pack(data, canonical_codes(huffman_lengths(count_frequencies(data))))
+
+
+def _reference_pack(data, codes):
+    encoded_bits = ''.join(codes[b] for b in data)
+    extra = 8 - len(encoded_bits) % 8
+    encoded_bits += '0' * extra
+    encoded_bytes = bytearray()
+    for i in range(0, len(encoded_bits), 8):
+        encoded_bytes.append(int(encoded_bits[i:i+8], 2))
+    return bytes(encoded_bytes), codes, extra
+
+
+def _reference_rs_encode(block, nsym):
+    """Per-call RSCodec (GF tables and generator polynomial rebuilt every time), as before the registry."""
+    return RSCodec(nsym).encode(block)
+
+
+def _reference_screen(oligos, max_run=3, gc_low=0.40, gc_high=0.60):
+    """Per-oligo homopolymer and GC checks used before whole-pool screening."""
+    return [not has_long_homopolymer(o, max_run) and gc_low <= gc_content(o) <= gc_high for o in oligos]
+
+
+def _peak_memory(fn, *args):
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def _reference_decompress(encoded_bytes, codes, extra):
+    """Bit-string Huffman decoder used before the table-driven one."""
+    rev = {v: k for k, v in codes.items()}
+    bits = ''.join(f"{byte:08b}" for byte in encoded_bytes)
+    bits = bits[:-extra] if extra else bits
+    buffer = ''
+    result = BytesIO()
+    for bit in bits:
+        buffer += bit
+        if buffer in rev:
+            result.write(bytes([rev[buffer]]))
+            buffer = ''
+    return result.getvalue()
+
+
+def _reference_bytes_to_dna(b):
+    """Bit-string bytes -> DNA encoder used before the lookup table."""
+    base_map = {'00': 'A', '01': 'C', '10': 'G', '11': 'T'}
+    bitstr = ''.join(f'{byte:08b}' for byte in b)
+    return ''.join(base_map[bitstr[i:i+2]] for i in range(0, len(bitstr), 2))
+
+
+def _reference_dna_to_bytes(dna):
+    """Bit-string DNA -> bytes decoder used before the vectorized one."""
+    rev_map = {'A': '00', 'C': '01', 'G': '10', 'T': '11'}
+    bitstr = ''.join(rev_map[c] for c in dna.strip() if c in rev_map)
+    bitstr = bitstr[: (len(bitstr) // 8) * 8]
+    return bytes(int(bitstr[i:i+8], 2) for i in range(0, len(bitstr), 8))
+
+
+# =============================
+# === BENCHMARKS ===
+# =============================
+
+def bench_huffman_tables():
+    print("Huffman frequency count + code lengths (reference vs bincount/two-queue)")
+    for path in SAMPLES:
+        data = open(path, "rb").read()
+        ref = _timeit(_reference_build_codes, data)
+        new = _timeit(lambda d: huffman_lengths(count_frequencies(d)), data)
+        print(f"  {os.path.basename(path):>10}: {ref * 1e3:8.2f} ms -> {new * 1e3:8.2f} ms  ({ref / new:.1f}x)")
+
+
+def bench_huffman_compress():
+    print("Huffman compress (reference vs bit-packed)")
+    for path in SAMPLES:
+        data = open(path, "rb").read()
+        encoded, codes, extra = compress(data)
+        assert (encoded, codes, extra) == _reference_compress_canonical(data)
+        out = decompress(encoded, codes, extra)
+        if isinstance(out, str):
+            out = out.encode("utf-8")
+        assert out == data
+        ref = _timeit(_reference_compress, data)
+        new = _timeit(compress, data)
+        ref_mem = _peak_memory(_reference_compress, data) / len(data)
+        new_mem = _peak_memory(compress, data) / len(data)
+        print(f"  {os.path.basename(path):>10}: {ref * 1e3:8.2f} ms -> {new * 1e3:8.2f} ms  ({ref / new:.1f}x), "
+              f"peak memory {ref_mem:.1f}x -> {new_mem:.1f}x input")
+
+
+def bench_huffman_decompress():
+    print("Huffman decompress (reference vs table-driven)")
+    for path in SAMPLES:
+        data = open(path, "rb").read()
+        encoded, codes, extra = compress(data)
+        out = decompress(encoded, codes, extra)
+        if isinstance(out, str):
+            out = out.encode("utf-8")
+        assert out == _reference_decompress(encoded, codes, extra) == data
+        ref = _timeit(_reference_decompress, encoded, codes, extra)
+        new = _timeit(decompress, encoded, codes, extra)
+        print(f"  {os.path.basename(path):>10}: {ref * 1e3:8.2f} ms -> {new * 1e3:8.2f} ms  ({ref / new:.1f}x)")
+
+
+def bench_dna_encode():
+    print("bytes -> DNA (reference vs lookup table), payload the size Cipher.txt carries")
+    data = open(CIPHER_SAMPLE, "rb").read()[:os.path.getsize(CIPHER_SAMPLE) // 4]
+    assert bytes_to_dna(data) == _reference_bytes_to_dna(data)
+    ref = _timeit(_reference_bytes_to_dna, data)
+    new = _timeit(bytes_to_dna, data)
+    print(f"  {len(data):>10} B: {ref * 1e3:8.2f} ms -> {new * 1e3:8.2f} ms  ({ref / new:.1f}x)")
+
+
+def bench_dna_decode():
+    print("DNA -> bytes (reference vs vectorized), cipher/Cipher.txt")
+    dna = open(CIPHER_SAMPLE, "rb").read()
+    assert dna_to_bytes(dna) == _reference_dna_to_bytes(dna.decode())
+    ref = _timeit(_reference_dna_to_bytes, dna.decode())
+    new = _timeit(dna_to_bytes, dna)
+    print(f"  {len(dna):>10} bases: {ref * 1e3:8.2f} ms -> {new * 1e3:8.2f} ms  ({ref / new:.1f}x), "
+          f"{len(dna) / new / 1e6:.0f} MB/s")
+
+
+def bench_aes_parallel(size=64 << 20):
+    print(f"AES-GCM, {size >> 20} MiB (single call vs segments across {os.cpu_count()} threads)")
+    data = os.urandom(size)
+    key = os.urandom(32)
+    assert decrypt_parallel(encrypt_parallel(data, key), key) == data
+    ref = _timeit(AESGCM(key).encrypt, os.urandom(12), data, None, repeat=3)
+    new = _timeit(encrypt_parallel, data, key, repeat=3)
+    print(f"  {ref * 1e3:8.2f} ms -> {new * 1e3:8.2f} ms  ({ref / new:.1f}x), {size / new / 1e6:.0f} MB/s")
+
+
+def bench_rs_oligo(count=2000, size=60, nsym=20):
+    print(f"RS encode per oligo, {size} B + {nsym} parity (new RSCodec per call vs shared codec)")
+    blocks = [os.urandom(size) for _ in range(count)]
+    assert all(rs_encode(b, nsym) == _reference_rs_encode(b, nsym) for b in blocks[:10])
+    ref = _timeit(lambda: [_reference_rs_encode(b, nsym) for b in blocks], repeat=3) / count
+    new = _timeit(lambda: [rs_encode(b, nsym) for b in blocks], repeat=3) / count
+    print(f"  {ref * 1e6:8.1f} us -> {new * 1e6:8.1f} us per oligo  ({ref / new:.1f}x)")
+
+
+def bench_rs_batch(size=1 << 20, nsym=32):
+    print(f"RS encode, {size >> 10} KiB (reedsolo codeword by codeword vs vectorized batch)")
+    data = os.urandom(size)
+    ref_encode = get_codec(nsym).encode
+    assert rs_encode_batch(data, nsym) == ref_encode(data)
+    ref = _timeit(ref_encode, data, repeat=1)
+    new = _timeit(rs_encode_batch, data, nsym)
+    print(f"  {ref * 1e3:8.2f} ms -> {new * 1e3:8.2f} ms  ({ref / new:.1f}x), {size / new / 1e6:.0f} MB/s")
+
+
+def bench_rs_decode(size=256 << 10, nsym=32, dirty_every=(0, 100, 10)):
+    print(f"RS decode, {size >> 10} KiB (reedsolo full decode vs syndrome-first fast path)")
+    data = os.urandom(size)
+    encoded = rs_encode_batch(data, nsym)
+    ref = _timeit(lambda: get_codec(nsym).decode(encoded), repeat=1)
+    for every in dirty_every:
+        damaged = bytearray(encoded)
+        if every:
+            damaged[::255 * every] = bytes(b ^ 1 for b in damaged[::255 * every])
+        assert rs_decode_batch(damaged, nsym) == data
+        new = _timeit(rs_decode_batch, damaged, nsym, repeat=3)
+        label = f"1 in {every} codewords damaged" if every else "no errors"
+        print(f"  {label:>28}: {ref * 1e3:8.2f} ms -> {new * 1e3:8.2f} ms  ({ref / new:.1f}x)")
+
+
+def bench_oligo_screen(count=100000, size=80):
+    print(f"Oligo constraint screening, {count} oligos of {size * 4} bases (per oligo vs whole pool)")
+    oligos = [bytes_to_dna(os.urandom(size)) for _ in range(count)]
+    assert screen_oligos(oligos)[0].tolist() == _reference_screen(oligos)
+    ref = _timeit(_reference_screen, oligos, repeat=3)
+    new = _timeit(screen_oligos, oligos, repeat=3)
+    print(f"  {ref * 1e3:8.2f} ms -> {new * 1e3:8.2f} ms  ({ref / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    bench_huffman_tables()
+    bench_huffman_compress()
+    bench_huffman_decompress()
+    bench_dna_encode()
+    bench_dna_decode()
+    bench_aes_parallel()
+    bench_rs_oligo()
+    bench_rs_batch()
+    bench_rs_decode()
+    bench_oligo_screen()
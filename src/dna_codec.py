@@ -2,9 +2,27 @@
 """
 Simple invertible bytes <-> DNA coder.
 This uses a deterministic 2-bit -> base mapping (00->A,01->C,10->G,11->T)
-and includes small helper checks for homopolymers and GC.
-For production synthesis use, replace with enumerative constrained coding.
+and includes small helper checks for homopolymers and GC;
+screen_oligos() runs the same checks over a whole pool of oligos at once.
+For synthesis, encode_constrained()/decode_constrained() provide a
+deterministic run-limited, GC-balanced code (see below), and
+pack_dna()/unpack_dna() a packed 2-bit-per-base storage format.
+Encoding is table driven: every byte maps straight to its 4 bases through
+a 256-entry table, gathered with NumPy. Decoding translates bases to 2-bit
+codes through a 256-entry table and packs four per byte, reporting the
+positions of any symbols that are not bases. The *_stream decoders do the
+same over bounded windows (e.g. of an mmapped file) for inputs of any size.
+With erase=True the decoders keep such symbols (N, lowercase, anything
+unknown) in place as a zero code and report the positions of the bytes they
+touch instead: those are erasures for the Reed-Solomon stage, and no byte
+after them is shifted.
 """
+import struct
+import sys
+import zlib
+from functools import lru_cache
+
+import numpy as np
 
 BASE_MAP = {
     '00': 'A',
@@ -14,21 +32,144 @@ BASE_MAP = {
 }
 REV_MAP = {v: k for k, v in BASE_MAP.items()}
 
-def bytes_to_dna(b: bytes) -> str:
-    bitstr = ''.join(f'{byte:08b}' for byte in b)
-    if len(bitstr) % 2:
-        bitstr += '0'  # pad one bit if needed
-    dna = ''.join(BASE_MAP[bitstr[i:i+2]] for i in range(0, len(bitstr), 2))
-    return dna
-
-def dna_to_bytes(dna: str) -> bytes:
-    bitstr = ''.join(REV_MAP[c] for c in dna)
-    # drop padding bits at the end if they were added (decoder should know original length via metadata)
-    pad = (-len(bitstr)) % 8
-    if pad:
-        # if padded when encoding, the encoder should record original length; here we just truncate
-        bitstr = bitstr[:-pad]
-    return bytes(int(bitstr[i:i+8], 2) for i in range(0, len(bitstr), 8))
+# Bases indexed by their 2-bit value (same mapping as BASE_MAP)
+ALPHABET = "ACGT"
+
+@lru_cache(maxsize=None)
+def encode_table(alphabet: str = ALPHABET) -> np.ndarray:
+    """(256, 4) uint8 table: row b holds the ASCII bases of byte b, MSB pair first."""
+    bases = np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)
+    b = np.arange(256)
+    return bases[np.stack([(b >> 6) & 3, (b >> 4) & 3, (b >> 2) & 3, b & 3], axis=1)]
+
+def bytes_to_dna(b, alphabet: str = ALPHABET) -> str:
+    """Convert bytes (or any buffer, e.g. a memoryview) -> dna string."""
+    arr = np.frombuffer(b, dtype=np.uint8)
+    return encode_table(alphabet)[arr].tobytes().decode('ascii')
+
+# decode_table() markers for symbols that are not bases
+SKIP = 0xFE     # whitespace: formatting only, ignored
+INVALID = 0xFF  # anything else: reported
+
+_WHITESPACE = b" \t\r\n\v\f"
+
+@lru_cache(maxsize=None)
+def decode_table(alphabet: str = ALPHABET) -> np.ndarray:
+    """(256,) uint8 table: ASCII code -> 2-bit value, SKIP or INVALID."""
+    table = np.full(256, INVALID, dtype=np.uint8)
+    table[np.frombuffer(_WHITESPACE, dtype=np.uint8)] = SKIP
+    table[np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+    return table
+
+def dna_to_codes(dna, alphabet: str = ALPHABET, erase: bool = False):
+    """
+    Translate a dna string (or ASCII buffer) to 2-bit codes, one per base.
+    Returns (codes, invalid) where invalid holds the positions in dna of
+    symbols that are neither bases nor whitespace; those are left out of codes.
+    With erase=True they stay in codes as 0 instead, and invalid holds their
+    positions in codes.
+    """
+    if isinstance(dna, str):
+        dna = dna.encode('latin-1', 'replace')  # 1 byte per char keeps positions
+    codes = decode_table(alphabet)[np.frombuffer(dna, dtype=np.uint8)]
+    if codes.size and codes.max() > 3:
+        if erase:
+            codes = codes[codes != SKIP]
+            invalid = np.flatnonzero(codes == INVALID)
+            codes[invalid] = 0
+            return codes, invalid
+        invalid = np.flatnonzero(codes == INVALID)
+        return codes[codes < 4], invalid
+    return codes, np.empty(0, dtype=np.intp)
+
+def codes_to_bytes(codes) -> bytes:
+    """Pack 2-bit codes four per byte (MSB pair first); a trailing partial byte is dropped."""
+    c = codes[:len(codes) // 4 * 4].reshape(-1, 4)
+    return ((c[:, 0] << 6) | (c[:, 1] << 4) | (c[:, 2] << 2) | c[:, 3]).tobytes()
+
+@lru_cache(maxsize=None)
+def pair_table(alphabet: str = ALPHABET) -> np.ndarray:
+    """(65536,) uint8 table: two ASCII bases read as little-endian uint16 -> 4-bit value, else INVALID."""
+    table = np.full(65536, INVALID, dtype=np.uint8)
+    bases = np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8).astype(np.uint16)
+    first, second = np.meshgrid(np.arange(4), np.arange(4), indexing='ij')
+    table[bases[first] | (bases[second] << 8)] = (first << 2) | second
+    return table
+
+def _decode_pairs(view, alphabet: str):
+    """Fast path for clean input: translate two bases per lookup. None if view has non-bases."""
+    if len(view) % 2:
+        return None
+    nibbles = pair_table(alphabet)[np.frombuffer(view, dtype='<u2')]
+    if nibbles.size and nibbles.max() >= 16:
+        return None
+    k = len(nibbles) // 2
+    return ((nibbles[0:2 * k:2] << 4) | nibbles[1:2 * k:2]).tobytes()
+
+def decode_dna(dna, alphabet: str = ALPHABET, erase: bool = False):
+    """
+    Vectorized dna -> bytes. Returns (bytes, positions of non-base symbols),
+    or with erase=True (bytes, positions of the bytes they touch).
+    """
+    if isinstance(dna, str):
+        dna = dna.encode('latin-1', 'replace')
+    view = memoryview(dna).cast('B')
+    end = len(view)
+    while end and view[end - 1] in _WHITESPACE:
+        end -= 1
+    out = _decode_pairs(view[:end], alphabet)
+    if out is not None:
+        return out, np.empty(0, dtype=np.intp)
+    codes, invalid = dna_to_codes(view, alphabet, erase)
+    if erase:
+        invalid = np.unique(invalid[invalid < len(codes) // 4 * 4] // 4)
+    return codes_to_bytes(codes), invalid
+
+# Bases per window in the streaming decoders: bounds their working memory
+DECODE_WINDOW = 1 << 22
+
+def iter_windows(buf, size: int = DECODE_WINDOW):
+    """Zero-copy memoryview slices of buf (e.g. an mmap), size bytes each."""
+    view = memoryview(buf).cast('B')
+    for start in range(0, len(view), size):
+        yield view[start:start + size]
+
+def decode_dna_stream(chunks, alphabet: str = ALPHABET, erase: bool = False):
+    """
+    Streaming decode_dna(): yields (bytes, invalid) for an iterable of DNA
+    chunks (ASCII buffers, e.g. iter_windows() of an mmap). Chunks need not
+    end on a byte boundary; invalid positions are offsets from the start of
+    the stream (of the output bytes with erase=True).
+    """
+    pending = np.empty(0, dtype=np.uint8)
+    pending_bad = np.empty(0, dtype=np.intp)
+    offset = out_offset = 0
+    for chunk in chunks:
+        view = memoryview(chunk).cast('B')
+        out = None if len(pending) or len(view) % 4 else _decode_pairs(view, alphabet)
+        if out is not None:
+            yield out, np.empty(0, dtype=np.intp)
+        else:
+            codes, invalid = dna_to_codes(view, alphabet, erase)
+            if erase:
+                invalid = np.concatenate([pending_bad, invalid + len(pending)])
+            if len(pending):
+                codes = np.concatenate([pending, codes])
+            cut = len(codes) // 4 * 4
+            pending = codes[cut:]
+            if erase:
+                pending_bad = invalid[invalid >= cut] - cut
+                yield codes_to_bytes(codes[:cut]), np.unique(invalid[invalid < cut] // 4) + out_offset
+            else:
+                yield codes_to_bytes(codes[:cut]), invalid + offset
+        offset += len(view)
+        out_offset += len(out) if out is not None else cut // 4
+
+def dna_to_bytes(dna, alphabet: str = ALPHABET) -> bytes:
+    out, invalid = decode_dna(dna, alphabet)
+    if len(invalid):
+        raise ValueError(f"{len(invalid)} non-{alphabet} symbols in DNA, first at positions {invalid[:8].tolist()}")
+    return out
 
 def has_long_homopolymer(dna: str, max_run: int = 3) -> bool:
     run = 1
@@ -46,3 +187,384 @@ def gc_content(dna: str) -> float:
         return 0.0
     gc = dna.count('G') + dna.count('C')
     return gc / len(dna)
+
+def oligo_array(oligos):
+    """
+    (n, length) uint8 array of ASCII bases and the length of each oligo, for
+    a list of DNA strings/buffers (shorter ones are zero-padded) or a 2-D array.
+    """
+    if isinstance(oligos, np.ndarray) and oligos.ndim == 2:
+        return oligos, np.full(len(oligos), oligos.shape[1], dtype=np.int64)
+    rows = [o.encode('ascii') if isinstance(o, str) else bytes(o) for o in oligos]
+    lengths = np.array([len(r) for r in rows], dtype=np.int64)
+    width = int(lengths.max()) if len(rows) else 0
+    if len(rows) and (lengths == width).all():
+        return np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(len(rows), width), lengths
+    arr = np.zeros((len(rows), width), dtype=np.uint8)
+    for row, r in zip(arr, rows):
+        row[:len(r)] = np.frombuffer(r, dtype=np.uint8)
+    return arr, lengths
+
+def screen_oligos(oligos, max_run: int = 3, gc_low: float = 0.40, gc_high: float = 0.60,
+                  window: int = 0, window_low: float = 0.25, window_high: float = 0.75):
+    """
+    Check a whole pool of oligos against the synthesis constraints in a few
+    NumPy passes: longest homopolymer run <= max_run, GC fraction within
+    [gc_low, gc_high], and with window > 0 the GC fraction of every window
+    bases within [window_low, window_high].
+    oligos: list of DNA strings or an (n, length) uint8 array of ASCII bases.
+    Returns (mask, diagnostics): mask[i] is True when oligo i passes;
+    diagnostics holds per-oligo arrays "max_run", "gc", and with a window
+    "window_gc_min" / "window_gc_max" (NaN for oligos shorter than window).
+    """
+    arr, lengths = oligo_array(oligos)
+    n, width = arr.shape
+    if not n or not width:
+        longest = np.zeros(n, dtype=np.int64)
+        gc = np.zeros(n)
+        mask = np.zeros(n, dtype=bool)
+        diagnostics = {"max_run": longest, "gc": gc}
+        if window > 0:
+            diagnostics["window_gc_min"] = diagnostics["window_gc_max"] = np.full(n, np.nan)
+        return mask, diagnostics
+
+    # run[:, j] is True while bases j..j+length-1 are equal; rows drop out once no run is left
+    same = arr[:, 1:] == arr[:, :-1]
+    if (lengths < width).any():
+        same &= arr[:, 1:] != 0  # zero padding is not a run
+    longest = (lengths > 0).astype(np.int64)
+    rows, run, length = np.arange(n), same, 2
+    while run.shape[1]:
+        hit = run.any(axis=1)
+        rows, run = rows[hit], run[hit]
+        if not len(rows):
+            break
+        longest[rows] = length
+        run = run[:, :-1] & same[rows, length - 1:]
+        length += 1
+
+    strong = (arr == ord('G')) | (arr == ord('C'))
+    gc = np.count_nonzero(strong, axis=1) / np.maximum(lengths, 1)
+    mask = (longest <= max_run) & (gc >= gc_low) & (gc <= gc_high) & (lengths > 0)
+    diagnostics = {"max_run": longest, "gc": gc}
+
+    if window > 0:
+        # GC count of every window from one cumulative sum; windows running into padding are ignored
+        counts = np.zeros((n, width + 1), dtype=np.int32)
+        np.cumsum(strong, axis=1, out=counts[:, 1:])
+        sums = counts[:, window:] - counts[:, :-window]
+        has_window = lengths >= window
+        if sums.shape[1] and (lengths < width).any():
+            complete = np.arange(sums.shape[1]) + window <= lengths[:, None]
+            low = np.where(complete, sums, window).min(axis=1)
+            high = np.where(complete, sums, 0).max(axis=1)
+        elif sums.shape[1]:
+            low, high = sums.min(axis=1), sums.max(axis=1)
+        else:
+            low = high = np.zeros(n, dtype=np.int32)
+        low = np.where(has_window, low / window, np.nan)
+        high = np.where(has_window, high / window, np.nan)
+        mask &= ~has_window | ((low >= window_low) & (high <= window_high))
+        diagnostics["window_gc_min"] = low
+        diagnostics["window_gc_max"] = high
+    return mask, diagnostics
+
+
+# =============================
+# === CONSTRAINED (GC-BALANCED) CODE ===
+# =============================
+#
+# Every 3 bits become one 2-base word made of one strong base (G/C) and one
+# weak base (A/T):  bit 2 = order (0: strong first, 1: weak first),
+# bit 1 = strong base (G/C), bit 0 = weak base (A/T).
+# Each word is exactly 50% GC and its two bases differ, so with no retries or
+# substitutions the output guarantees:
+#   - homopolymer runs of at most CONSTRAINED_MAX_RUN (2) bases,
+#   - GC count within 1 of half in any window (e.g. 0.45-0.55 over 20 bases).
+# 3 bytes -> 8 words -> 16 bases (1.5 bits/base). A trailing 1 or 2 bytes
+# become 6 or 12 bases, so the base count alone tells the decoder the length.
+
+# Identifier written to metadata by users of this code
+CONSTRAINED_CODE_ID = "gc-balanced-3b2n"
+CONSTRAINED_MAX_RUN = 2
+
+# Bases per group of 3 bytes, and bases used by a trailing 1 or 2 bytes
+_GROUP_BASES = 16
+_TAIL_WORDS = {0: 0, 1: 3, 2: 6}
+_TAIL_BYTES = {0: 0, 6: 1, 12: 2}
+
+@lru_cache(maxsize=None)
+def _word_table() -> np.ndarray:
+    """(8, 2) uint8 table: 3-bit symbol -> two ASCII bases."""
+    words = []
+    for v in range(8):
+        strong = "GC"[(v >> 1) & 1]
+        weak = "AT"[v & 1]
+        words.append(weak + strong if v >> 2 else strong + weak)
+    return np.frombuffer("".join(words).encode('ascii'), dtype=np.uint8).reshape(8, 2)
+
+@lru_cache(maxsize=None)
+def _word_decode_table() -> np.ndarray:
+    """(16,) table: pair of ALPHABET codes (first * 4 + second) -> 3-bit symbol, else INVALID."""
+    table = np.full(16, INVALID, dtype=np.uint8)
+    codes = decode_table(ALPHABET)
+    for v, (a, b) in enumerate(_word_table()):
+        table[codes[a] * 4 + codes[b]] = v
+    return table
+
+def encode_constrained(data) -> str:
+    """bytes -> run-limited, GC-balanced DNA (16 bases per 3 bytes)."""
+    arr = np.frombuffer(data, dtype=np.uint8)
+    n = len(arr)
+    padded = np.zeros(-(-n // 3) * 3, dtype=np.uint32)
+    padded[:n] = arr
+    groups = padded.reshape(-1, 3)
+    value = (groups[:, 0] << 16) | (groups[:, 1] << 8) | groups[:, 2]
+    symbols = (value[:, None] >> np.arange(21, -1, -3, dtype=np.uint32)) & 7
+    symbols = symbols.reshape(-1)[:(n // 3) * 8 + _TAIL_WORDS[n % 3]]
+    return _word_table()[symbols].tobytes().decode('ascii')
+
+def decode_constrained(dna, erase: bool = False):
+    """
+    Inverse of encode_constrained(). Returns (bytes, invalid) where invalid
+    holds base indices (whitespace not counted) of words that break the code
+    (both bases strong or both weak) and of non-base symbols. Non-base
+    symbols keep their place as a zero code, so later words stay aligned,
+    and broken words decode as zero bits.
+    With erase=True invalid holds the positions of the bytes touched by
+    broken words instead (constrained_erasures()).
+    """
+    codes, bad = dna_to_codes(dna, erase=True)
+    out, invalid = decode_constrained_codes(codes, bad)
+    return out, constrained_erasures(invalid, len(out)) if erase else invalid
+
+def constrained_erasures(bases, n_bytes: int) -> np.ndarray:
+    """
+    Byte positions touched by the words at these base indices (from the
+    start of a constrained-code stream); a 3-bit word can straddle two bytes.
+    """
+    words = np.asarray(bases, dtype=np.int64) // 2
+    first = words // 8 * 3 + (words % 8) * 3 // 8
+    last = words // 8 * 3 + ((words % 8) * 3 + 2) // 8
+    touched = np.unique(np.concatenate([first, last]))
+    return touched[touched < n_bytes]
+
+def decode_constrained_codes(codes, bad=()):
+    """decode_constrained() on 2-bit ALPHABET codes (e.g. straight from a .2bit payload)."""
+    n = len(codes)
+    if n % _GROUP_BASES not in _TAIL_BYTES:
+        raise ValueError(f"{n} bases is not a valid constrained-code length.")
+    pairs = codes.reshape(-1, 2)
+    symbols = _word_decode_table()[pairs[:, 0].astype(np.intp) * 4 + pairs[:, 1]]
+    invalid = np.flatnonzero(symbols == INVALID) * 2
+    if len(bad):
+        invalid = np.union1d(invalid, bad)
+    symbols = np.where(symbols == INVALID, 0, symbols).astype(np.uint32)
+
+    full = n // _GROUP_BASES
+    words = symbols[:full * 8].reshape(-1, 8)
+    value = np.bitwise_or.reduce(words << np.arange(21, -1, -3, dtype=np.uint32), axis=1)
+    out = np.stack([value >> 16, value >> 8, value], axis=1).astype(np.uint8).tobytes()
+
+    tail_bytes = _TAIL_BYTES[n % _GROUP_BASES]
+    if tail_bytes:
+        tail = 0
+        for v in symbols[full * 8:].tolist():
+            tail = (tail << 3) | v
+        tail >>= 3 * _TAIL_WORDS[tail_bytes] - 8 * tail_bytes  # drop the padding bits
+        out += tail.to_bytes(tail_bytes, 'big')
+    return out, invalid
+
+def encode_constrained_stream(chunks):
+    """Streaming encode_constrained(): yields DNA for an iterable of byte chunks."""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        cut = len(pending) // 3 * 3
+        if cut:
+            yield encode_constrained(pending[:cut])
+            pending = pending[cut:]
+    yield encode_constrained(pending)
+
+def decode_constrained_stream(chunks, erase: bool = False):
+    """
+    Streaming decode_constrained(): yields (bytes, invalid) for an iterable of
+    DNA chunks (str or ASCII bytes, whitespace ignored). invalid positions
+    are offsets from the start of the stream, as in decode_constrained().
+    """
+    bad = []
+    def codes():
+        offset = 0
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('latin-1', 'replace')
+            # Non-base symbols stay in place as zero codes; their positions are in code space
+            c, b = dna_to_codes(chunk, erase=True)
+            bad.append(b + offset)
+            offset += len(c)
+            yield c
+    yield from decode_constrained_codes_stream(codes(), erase=erase, bad=bad)
+
+def decode_constrained_codes_stream(code_chunks, erase: bool = False, bad=None):
+    """
+    decode_constrained_codes() over an iterable of 2-bit code arrays; yields
+    (bytes, invalid), or with erase=True (bytes, erased byte positions from
+    the start of the stream). bad may be a list the code source appends
+    stream positions of non-base symbols to (see decode_constrained_stream).
+    """
+    pending = np.empty(0, dtype=np.uint8)
+    offset = out_offset = 0
+    held = np.empty(0, dtype=np.int64)
+
+    def decode(codes):
+        nonlocal held, out_offset
+        out, invalid = decode_constrained_codes(codes)
+        invalid = invalid + offset
+        if bad:
+            held = np.concatenate([held] + [np.asarray(b, dtype=np.int64) for b in bad])
+            bad.clear()
+        if len(held):
+            mine = held < offset + len(codes)
+            invalid = np.union1d(invalid, held[mine])
+            held = held[~mine]
+        if erase:
+            # Groups of 16 bases are 3 bytes, so stream positions map the same way
+            invalid = constrained_erasures(invalid, out_offset + len(out))
+            invalid = invalid[invalid >= out_offset]
+        out_offset += len(out)
+        return out, invalid
+
+    for codes in code_chunks:
+        pending = np.concatenate([pending, codes])
+        # Keep the last group back: only the end of the stream may be a short tail
+        cut = max(len(pending) // _GROUP_BASES - 1, 0) * _GROUP_BASES
+        if cut:
+            yield decode(pending[:cut])
+            offset += cut
+            pending = pending[cut:]
+    yield decode(pending)
+
+
+# =============================
+# === PACKED 2-BIT STORAGE (.2bit) ===
+# =============================
+#
+# 2 bits per base instead of one ASCII byte, like UCSC .2bit. Layout:
+#   b"DNA2" | version (1) | mapping id (1) | reserved (2)
+#   | base count (8, big-endian) | CRC-32 of payload (4) | payload
+# The payload holds the 2-bit codes of the mapping's alphabet, four bases per
+# byte, MSB pair first. With the mapping a text codec uses, the payload is
+# exactly the bytes that codec would decode, so no string is ever built.
+
+PACKED_MAGIC = b"DNA2"
+PACKED_VERSION = 1
+_PACKED_HEADER = struct.Struct(">4sBBHQI")
+
+# Mapping id -> alphabet (bases indexed by 2-bit value)
+PACKED_MAPPINGS = {0: "ACGT", 1: "AGCT"}
+_MAPPING_IDS = {alphabet: i for i, alphabet in PACKED_MAPPINGS.items()}
+
+def is_packed(blob) -> bool:
+    return bytes(blob[:4]) == PACKED_MAGIC
+
+def packed_from_bytes(data, alphabet: str = ALPHABET) -> bytes:
+    """.2bit record for bytes_to_dna(data, alphabet), without building the string."""
+    header = _PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, _MAPPING_IDS[alphabet], 0,
+                                 4 * len(data), zlib.crc32(data))
+    return header + bytes(data)
+
+def pack_dna(dna, alphabet: str = ALPHABET) -> bytes:
+    """.2bit record for a DNA string (whitespace ignored, other non-bases rejected)."""
+    codes, invalid = dna_to_codes(dna, alphabet)
+    if len(invalid):
+        raise ValueError(f"{len(invalid)} non-{alphabet} symbols cannot be packed, first at {invalid[:8].tolist()}")
+    n = len(codes)
+    padded = np.zeros(-(-n // 4) * 4, dtype=np.uint8)
+    padded[:n] = codes
+    payload = codes_to_bytes(padded)
+    header = _PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, _MAPPING_IDS[alphabet], 0,
+                                 n, zlib.crc32(payload))
+    return header + payload
+
+def read_packed(blob, verify: bool = True):
+    """
+    Validate a .2bit record. Returns (payload, base count, alphabet); payload
+    is a zero-copy memoryview. verify=False skips the CRC, for payloads that
+    carry their own error correction (which a CRC failure would pre-empt).
+    """
+    view = memoryview(blob)
+    magic, version, mapping, _, n, crc = _PACKED_HEADER.unpack_from(view, 0)
+    if magic != PACKED_MAGIC:
+        raise ValueError("Not a packed DNA (.2bit) record.")
+    if version > PACKED_VERSION or mapping not in PACKED_MAPPINGS:
+        raise ValueError(f"Unsupported packed DNA version/mapping: {version}/{mapping}")
+    payload = view[_PACKED_HEADER.size:_PACKED_HEADER.size + (n + 3) // 4]
+    if len(payload) * 4 < n:
+        raise ValueError("Packed DNA record is truncated.")
+    if verify and zlib.crc32(payload) != crc:
+        raise ValueError("Packed DNA checksum mismatch (corrupted).")
+    return payload, n, PACKED_MAPPINGS[mapping]
+
+def _payload_codes(payload, stored: str, alphabet: str) -> np.ndarray:
+    arr = np.frombuffer(payload, dtype=np.uint8)
+    codes = ((arr[:, None] >> np.array([6, 4, 2, 0], dtype=np.uint8)) & 3).reshape(-1)
+    if stored != alphabet:
+        remap = decode_table(alphabet)[np.frombuffer(stored.encode('ascii'), dtype=np.uint8)]
+        codes = remap[codes]
+    return codes
+
+def packed_to_codes(blob, alphabet: str = ALPHABET) -> np.ndarray:
+    """2-bit codes (in alphabet's order) of every base in a .2bit record."""
+    payload, n, stored = read_packed(blob)
+    return _payload_codes(payload, stored, alphabet)[:n]
+
+def packed_codes_stream(blob, alphabet: str = ALPHABET, window: int = DECODE_WINDOW, verify: bool = True):
+    """
+    packed_to_codes() in arrays of at most window bases. verify=False: see
+    read_packed(); the record is still rejected if truncated.
+    """
+    payload, n, stored = read_packed(blob, verify)
+    step = max(window // 4, 1)
+    for start in range(0, len(payload), step):
+        yield _payload_codes(payload[start:start + step], stored, alphabet)[:n - 4 * start]
+
+def packed_to_bytes(blob, alphabet: str = ALPHABET):
+    """
+    Same as decode_dna(unpack_dna(blob), alphabet)[0]: when the record uses
+    alphabet's mapping the payload itself is returned (zero copy).
+    """
+    payload, n, stored = read_packed(blob)
+    if stored == alphabet:
+        return payload[:n // 4]
+    return codes_to_bytes(packed_to_codes(blob, alphabet))
+
+def packed_bytes_stream(blob, alphabet: str = ALPHABET, window: int = DECODE_WINDOW, verify: bool = True):
+    """
+    packed_to_bytes() in pieces of window bases; zero-copy slices when the
+    mapping matches. verify=False: see read_packed().
+    """
+    payload, n, stored = read_packed(blob, verify)
+    if stored == alphabet:
+        yield from iter_windows(payload[:n // 4], max(window // 4, 1))
+        return
+    for codes in packed_codes_stream(blob, alphabet, window, verify=False):
+        yield codes_to_bytes(codes)
+
+def unpack_dna(blob) -> str:
+    """.2bit record -> DNA string."""
+    _, _, stored = read_packed(blob)
+    codes = packed_to_codes(blob, stored)
+    return np.frombuffer(stored.encode('ascii'), dtype=np.uint8)[codes].tobytes().decode('ascii')
+
+def convert_cipher_file(src: str, dst: str, alphabet: str = ALPHABET):
+    """Lossless text <-> .2bit conversion; the direction follows src's format."""
+    with open(src, "rb") as f:
+        blob = f.read()
+    out = unpack_dna(blob).encode('ascii') if is_packed(blob) else pack_dna(blob, alphabet)
+    with open(dst, "wb") as f:
+        f.write(out)
+
+
+if __name__ == "__main__":
+    # Usage: python dna_codec.py <src> <dst> [alphabet]  (Cipher.txt <-> Cipher.2bit)
+    convert_cipher_file(*sys.argv[1:4])
@@ -10,7 +10,9 @@ Mapping:
 
 This codec is invertible and fast. For synthesis-grade constraints
 you can swap to the more advanced encoder/packer in previous messages.
+Encoding uses the table-driven codec in dna_codec.
 """
+import dna_codec
 
 BASE_MAP = {
     '00': 'A',
@@ -20,19 +22,41 @@ BASE_MAP = {
 }
 REV_MAP = {v: k for k, v in BASE_MAP.items()}
 
-def bytes_to_dna(b: bytes) -> str:
-    """Convert bytes -> dna string (A/C/G/T)."""
-    bitstr = ''.join(f'{byte:08b}' for byte in b)
-    if len(bitstr) % 2:
-        bitstr += '0'
-    dna = ''.join(BASE_MAP[bitstr[i:i+2]] for i in range(0, len(bitstr), 2))
-    return dna
+def bytes_to_dna(b) -> str:
+    """Convert bytes (or a memoryview) -> dna string (A/C/G/T)."""
+    return dna_codec.bytes_to_dna(b)
 
-def dna_to_bytes(dna: str) -> bytes:
-    """Convert dna string (A/C/G/T) -> bytes."""
-    bitstr = ''.join(REV_MAP[c] for c in dna.strip() if c in REV_MAP)
-    # if padded, truncate to whole bytes
-    if len(bitstr) % 8 != 0:
-        bitstr = bitstr[: (len(bitstr) // 8) * 8 ]
-    out = bytes(int(bitstr[i:i+8], 2) for i in range(0, len(bitstr), 8))
+def dna_to_bytes(dna, erasures=None) -> bytes:
+    """
+    Convert dna string (A/C/G/T) -> bytes.
+    Symbols that are not bases (N, lowercase, ...) keep their place as zero
+    bits, so later bytes are not shifted; the positions of the bytes they
+    touch are reported, and appended to erasures (a list) for the RS decoder.
+    """
+    out, erased = dna_codec.decode_dna(dna, erase=True)
+    if len(erased):
+        print(f"[dna_utils] Warning: {len(erased)} bytes hold non-ACGT symbols, "
+              f"first at byte positions {erased[:8].tolist()}")
+        if erasures is not None:
+            erasures.append(erased)
     return out
+
+def dna_to_bytes_stream(chunks, erasures=None):
+    """
+    dna_to_bytes() over an iterable of DNA chunks (e.g. windows of an mmapped
+    cipher); yields bytes per chunk and warns once at the end about non-ACGT
+    symbols. Erased byte positions (from the start of the stream) are added
+    to erasures before the bytes they belong to are yielded, as
+    ecc_utils.decode_ecc_stream() expects.
+    """
+    count, first = 0, []
+    for out, erased in dna_codec.decode_dna_stream(chunks, erase=True):
+        if len(erased):
+            count += len(erased)
+            first.extend(erased[:8 - len(first)].tolist())
+            if erasures is not None:
+                erasures.append(erased)
+        yield out
+    if count:
+        print(f"[dna_utils] Warning: {count} bytes hold non-ACGT symbols, "
+              f"first at byte positions {first}; decoded as erasures")
@@ -6,41 +6,43 @@ import hashlib
 
 try:
     import reedsolo
+    from ecc_utils import decode_ecc_stream, interleave, rs_decode_batch, rs_encode_batch
     _USE_RS = True
 except ImportError:
     _USE_RS = False
     print("[ecc.py] Warning: 'reedsolo' not found. Using fallback ECC (simple redundancy).")
 
+# Default RS geometry: parity bytes per codeword, codeword size
+NSYM = 16
+NSIZE = 255
+
 
 # ===============================
 # Reed–Solomon ECC encode/decode
 # ===============================
-def ecc_encode(data: bytes, nsym: int = 16) -> bytes:
+def ecc_encode(data: bytes, nsym: int = NSYM, depth: int = 1) -> bytes:
     """
     Apply ECC redundancy to the ciphertext bytes.
-    If reedsolo is available: uses proper RS encoding.
+    If reedsolo is available: uses proper RS encoding, codewords interleaved
+    at the given depth against burst errors (ecc_utils.interleave).
     Otherwise, appends SHA256 checksum for integrity.
     """
     if _USE_RS:
-        rs = reedsolo.RSCodec(nsym)
-        encoded = rs.encode(data)
-        return encoded
+        return interleave(rs_encode_batch(data, nsym, depth=depth), nsym, depth)
     else:
         checksum = hashlib.sha256(data).digest()
         return data + checksum
 
 
-def ecc_decode(encoded: bytes, nsym: int = 16) -> bytes:
+def ecc_decode(encoded: bytes, nsym: int = NSYM, depth: int = 1, erase_pos=None) -> bytes:
     """
     Decode and verify ECC-corrected data.
-    If RS available, attempts to fix errors.
+    If RS available, attempts to fix errors (erase_pos: known-bad positions).
     Fallback verifies checksum integrity.
     """
     if _USE_RS:
-        rs = reedsolo.RSCodec(nsym)
         try:
-            decoded = rs.decode(encoded)[0]  # returns (data, ecc)
-            return decoded
+            return rs_decode_batch(encoded, nsym, depth=depth, erase_pos=erase_pos)  # only codewords with errors are fully decoded
         except reedsolo.ReedSolomonError as e:
             print(f"[ecc.py] Reed–Solomon failed to fully correct: {e}")
             raise
@@ -53,6 +55,30 @@ def ecc_decode(encoded: bytes, nsym: int = 16) -> bytes:
         return data
 
 
+def ecc_decode_stream(chunks, nsym: int = NSYM, nsize: int = NSIZE, depth: int = 1, erasures=None):
+    """
+    ecc_decode() over an iterable of encoded chunks; yields decoded bytes.
+    RS codewords (groups of depth when interleaved) are corrected as soon as
+    they are complete; the fallback checksum is verified after the last chunk.
+    erasures: see ecc_utils.decode_ecc_stream().
+    """
+    if _USE_RS:
+        yield from decode_ecc_stream(chunks, nsym, nsize, depth, erasures)
+    else:
+        digest = hashlib.sha256()
+        pending = b""
+        for chunk in chunks:
+            pending += chunk
+            if len(pending) > 32:
+                data, pending = pending[:-32], pending[-32:]
+                digest.update(data)
+                yield data
+        if len(pending) < 32:
+            raise ValueError("Encoded data too short to contain checksum.")
+        if digest.digest() != pending:
+            raise ValueError("[ecc.py] ECC checksum verification failed.")
+
+
 # ===============================
 # Optional noise simulation
 # ===============================
@@ -1,18 +1,13 @@
 # ecc_rs.py
-from reedsolo import RSCodec
+from ecc_utils import get_codec, rs_decode_batch
 
 def rs_encode(block: bytes, nsym: int = 32) -> bytes:
     """Return block with Reed-Solomon parity bytes appended."""
-    rsc = RSCodec(nsym)
-    return rsc.encode(block)
+    return get_codec(nsym).encode(block)
 
-def rs_decode(encoded: bytes, nsym: int = 32) -> bytes:
+def rs_decode(encoded: bytes, nsym: int = 32, erase_pos=None) -> bytes:
     """Decode Reed-Solomon encoded bytes and return original bytes.
-    Raises ReedSolomonError if unrecoverable.
+    Raises ReedSolomonError if unrecoverable. Error-free input skips the full decode.
+    erase_pos: positions known to be unreliable, decoded as erasures.
     """
-    rsc = RSCodec(nsym)
-    decoded = rsc.decode(encoded)
-    # reedsolo.decode may return a tuple on some versions
-    if isinstance(decoded, tuple):
-        return decoded[0]
-    return decoded
+    return rs_decode_batch(encoded, nsym, workers=1, erase_pos=erase_pos)
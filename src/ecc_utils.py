@@ -1,22 +1,363 @@
 # ecc_utils.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
 from reedsolo import RSCodec
 
-def add_ecc(data: bytes, nsym: int = 32) -> bytes:
+@lru_cache(maxsize=None)
+def get_codec(nsym: int, nsize: int = 255, fcr: int = 0, prim: int = 0x11d) -> RSCodec:
+    """
+    Shared RSCodec for these parameters. Building one computes the GF(2^8)
+    log/exp tables and the generator polynomial, so codecs are built once
+    and reused by every caller (ecc.py, ecc_rs.py, batch.py, oligo_packer.py).
+    RSCodec restores its own tables on each encode/decode, so codecs with
+    different parameters can be used side by side.
+    """
+    return RSCodec(nsym, nsize=nsize, fcr=fcr, prim=prim)
+
+# Fewer dirty codewords than this are corrected inline: a process pool costs more to start
+PARALLEL_MIN_DIRTY = 8
+
+@lru_cache(maxsize=None)
+def _feedback_table(nsym: int, nsize: int = 255, fcr: int = 0, prim: int = 0x11d) -> np.ndarray:
+    """
+    (nsym, 256) table: column c holds c * g(x) without g's leading 1, built
+    from the codec's own log/antilog tables and generator polynomial.
+    """
+    codec = get_codec(nsym, nsize, fcr, prim)
+    gf_exp = np.array(codec.gf_exp, dtype=np.uint8)
+    gf_log = np.array(codec.gf_log, dtype=np.int64)
+    lgen = gf_log[np.array(codec.gen[nsym][1:], dtype=np.int64)]
+    table = gf_exp[gf_log[:, None] + lgen[None, :]]
+    table[0] = 0  # log(0) is undefined: a zero feedback adds nothing
+    return np.ascontiguousarray(table.T)
+
+def rs_parity_blocks(blocks, nsym: int = 32, nsize: int = 255, fcr: int = 0, prim: int = 0x11d) -> np.ndarray:
+    """
+    Parity symbols of many messages at once: blocks is a 2-D uint8 array,
+    one message per row (at most nsize - nsym bytes each). Returns a
+    (rows, nsym) array, row i equal to the parity reedsolo appends to row i.
+    Same synthetic division as reedsolo.rs_encode_msg, with each step run
+    across all rows (columns of the transposed work array).
+    """
+    blocks = np.asarray(blocks, dtype=np.uint8)
+    rows, k = blocks.shape
+    if k + nsym > nsize:
+        raise ValueError(f"Message is too long ({k + nsym} when max is {nsize})")
+    work = np.zeros((k + nsym, rows), dtype=np.uint8)
+    work[:k] = blocks.T
+    _divide(work, k, _feedback_table(nsym, nsize, fcr, prim))
+    return np.ascontiguousarray(work[k:].T)
+
+def _divide(work, k: int, table):
+    """Synthetic division down the rows of work, one codeword per column; rows k.. end as the remainder."""
+    nsym = table.shape[0]
+    for i in range(k):
+        work[i + 1:i + 1 + nsym] ^= table[:, work[i]]
+
+def rs_remainders(codewords, nsym: int = 32, nsize: int = 255, fcr: int = 0, prim: int = 0x11d) -> np.ndarray:
+    """
+    Remainder of every codeword divided by the generator polynomial, all at
+    once. codewords is a uint8 array of shape (..., n), any strides (e.g. a
+    deinterleave_view()); returns (codewords, nsym) in C order. A row is all
+    zero exactly when all nsym syndromes of that codeword are zero, i.e. it
+    has no errors.
+    """
+    codewords = np.asarray(codewords, dtype=np.uint8)
+    n = codewords.shape[-1]
+    if n <= nsym or n > nsize:
+        raise ValueError(f"Codeword length {n} out of range for nsym={nsym}, nsize={nsize}")
+    # The one copy: into the division's own work array, one codeword per column
+    work = np.array(np.moveaxis(codewords, -1, 0), order="C").reshape(n, -1)
+    _divide(work, n - nsym, _feedback_table(nsym, nsize, fcr, prim))
+    return np.ascontiguousarray(work[n - nsym:].T)
+
+# =============================
+# === INTERLEAVING ===
+# =============================
+# Depth D writes each group of D consecutive codewords column by column
+# (byte 0 of each, then byte 1 of each, ...), so a burst of L bytes costs
+# each codeword of the group about L / D errors instead of L in one. The
+# message left after the last whole group is split evenly across
+# min(D, its length) shortened codewords (rs_encode_batch), so the last
+# group is interleaved at full depth too: with c codewords, codeword i
+# holds bytes i, i + c, i + 2c, ... of the group, the first ones one byte
+# longer when the lengths differ. The group's length alone gives c, and at
+# depth 1 the layout is the plain codeword sequence reedsolo writes.
+
+def _last_group(length: int, depth: int, nsym: int, nsize: int):
+    """
+    (whole groups, codewords in the last group, their length, how many of
+    them are one byte longer) of an interleaved stream of the given length.
+    """
+    groups, rest = divmod(length, depth * nsize)
+    if not rest:
+        return groups, 0, 0, 0
+    # min(depth, message bytes) codewords, each nsym parity + at least one message byte
+    count = depth if rest >= depth * (nsym + 1) else max(rest // (nsym + 1), 1)
+    base, longer = divmod(rest, count)
+    return groups, count, base, longer
+
+def _last_group_order(rest: int, count: int) -> np.ndarray:
+    """Positions in the last group of its bytes in codeword order (codeword i holds i, i + count, ...)."""
+    return np.argsort(np.arange(rest) % count, kind="stable")
+
+def _interleaved_views(buf, depth: int, nsym: int, nsize: int):
+    """
+    Codewords of an interleaved stream in codeword order, as arrays of
+    equal-length codewords: a zero-copy (groups, depth, nsize) view of the
+    whole groups, then the last group's longer codewords (a small copy) and
+    its shorter ones (a strided view).
+    """
+    groups, count, base, longer = _last_group(len(buf), depth, nsym, nsize)
+    start = groups * depth * nsize
+    views = [buf[:start].reshape(groups, nsize, depth).transpose(0, 2, 1)]
+    if count:
+        columns = buf[start:start + base * count].reshape(base, count).T
+        extra = buf[start + base * count:]
+        views.append(np.concatenate([columns[:longer], extra[:, None]], axis=1))
+        views.append(columns[longer:])
+    return [v for v in views if v.size]
+
+def _codeword_positions(positions, length: int, depth: int, nsym: int, nsize: int):
+    """
+    (codeword index, offset in codeword) of byte positions of an interleaved
+    stream of the given length: the inverse of the _interleaved_views() layout.
+    """
+    pos = np.asarray(positions, dtype=np.int64)
+    groups, count, _, _ = _last_group(length, depth, nsym, nsize)
+    group = depth * nsize
+    start = groups * group
+    index = np.empty_like(pos)
+    offset = np.empty_like(pos)
+    body = pos < start
+    index[body] = pos[body] // group * depth + pos[body] % group % depth
+    offset[body] = pos[body] % group // depth
+    last = ~body
+    index[last] = groups * depth + (pos[last] - start) % max(count, 1)
+    offset[last] = (pos[last] - start) // max(count, 1)
+    return index, offset
+
+def deinterleave_view(data, nsym: int, depth: int, nsize: int = 255):
+    """Codewords of an interleave()d stream, as strided views where possible (see _interleaved_views)."""
+    return _interleaved_views(np.frombuffer(data, dtype=np.uint8), depth, nsym, nsize)
+
+def interleave(encoded, nsym: int, depth: int, nsize: int = 255) -> bytearray:
+    """
+    Reorder RS-encoded bytes for transmission at the given depth. encoded
+    is rs_encode_batch(..., depth=depth) output, in codeword order.
+    """
+    src = np.frombuffer(encoded, dtype=np.uint8)
+    out = bytearray(len(src))
+    if depth <= 1:
+        out[:] = encoded
+        return out
+    dst = np.frombuffer(out, dtype=np.uint8)
+    groups, count, _, _ = _last_group(len(src), depth, nsym, nsize)
+    start = groups * depth * nsize
+    dst[:start].reshape(groups, nsize, depth)[...] = src[:start].reshape(groups, depth, nsize).transpose(0, 2, 1)
+    if count:
+        dst[start:][_last_group_order(len(src) - start, count)] = src[start:]
+    return out
+
+def deinterleave(data, nsym: int, depth: int, nsize: int = 255) -> bytearray:
+    """Inverse of interleave(): the codewords back in order, as one contiguous buffer."""
+    out = bytearray(len(data))
+    if depth <= 1:
+        out[:] = data
+        return out
+    src = np.frombuffer(data, dtype=np.uint8)
+    dst = np.frombuffer(out, dtype=np.uint8)
+    groups, count, _, _ = _last_group(len(src), depth, nsym, nsize)
+    start = groups * depth * nsize
+    dst[:start].reshape(groups, depth, nsize)[...] = src[:start].reshape(groups, nsize, depth).transpose(0, 2, 1)
+    if count:
+        dst[start:] = src[start:][_last_group_order(len(src) - start, count)]
+    return out
+
+def _correct_codewords(args):
+    codewords, nsym, nsize, fcr, prim = args
+    rs = get_codec(nsym, nsize, fcr, prim)
+    return [_message(rs.decode(codeword, erase_pos=erase_pos)) for codeword, erase_pos in codewords]
+
+def _correct(codewords, nsym, nsize, fcr, prim, workers, pool=None):
+    """
+    Full reedsolo decode of the dirty (codeword, erasure positions or None)
+    pairs, across a process pool when there are many: pool if given (left
+    running for the caller's next batch), else one started for this call.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(codewords) < PARALLEL_MIN_DIRTY:
+        return _correct_codewords((codewords, nsym, nsize, fcr, prim))
+    step = -(-len(codewords) // workers)
+    jobs = [(codewords[i:i + step], nsym, nsize, fcr, prim) for i in range(0, len(codewords), step)]
+    if pool is not None:
+        return [message for part in pool.map(_correct_codewords, jobs) for message in part]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [message for part in pool.map(_correct_codewords, jobs) for message in part]
+
+def rs_decode_batch(encoded, nsym: int = 32, nsize: int = 255, fcr: int = 0, prim: int = 0x11d,
+                    workers=None, depth: int = 1, erase_pos=None, pool=None) -> bytearray:
+    """
+    get_codec(nsym, nsize).decode(encoded) message bytes, syndrome first:
+    one vectorized rs_remainders() pass finds the codewords with errors,
+    clean ones have their parity stripped through a strided view of the
+    input, and only the dirty ones go through reedsolo's Berlekamp-Massey /
+    Forney correction (in parallel, workers=None: one process per core).
+    Decode time follows the number of damaged codewords, not the payload.
+    depth > 1 reads a stream written with interleave() in place.
+    erase_pos lists positions in encoded known to be unreliable (e.g. from
+    dna_codec's erase=True decoders); they reach reedsolo as erasures, which
+    cost half the correction capacity of an unknown error.
+    pool is an optional ProcessPoolExecutor to correct on instead of
+    starting one, for callers decoding many batches.
+    Raises reedsolo.ReedSolomonError if a codeword cannot be corrected.
+    """
+    depth = max(depth, 1)
+    views = deinterleave_view(encoded, nsym, depth, nsize)
+    erasures = {}
+    if erase_pos is not None and len(erase_pos):
+        for index, offset in zip(*_codeword_positions(erase_pos, len(encoded), depth, nsym, nsize)):
+            erasures.setdefault(int(index), []).append(int(offset))
+    out = bytearray(sum(view.size // view.shape[-1] * max(view.shape[-1] - nsym, 0) for view in views))
+    dst = np.frombuffer(out, dtype=np.uint8)
+
+    dirty = []  # (offset in out, (codeword, erasures))
+    pos = index = 0
+    for view in views:
+        n = view.shape[-1]
+        k = max(n - nsym, 0)
+        count = view.size // n
+        if k:
+            dst[pos:pos + count * k].reshape(view.shape[:-1] + (k,))[...] = view[..., :k]
+            bad = np.flatnonzero(rs_remainders(view, nsym, nsize, fcr, prim).any(axis=1))
+        else:
+            bad = np.arange(count)  # no room for a message: reedsolo reports it
+        for i in bad:
+            codeword = bytes(view[np.unravel_index(i, view.shape[:-1])])
+            dirty.append((pos + i * k, (codeword, erasures.get(index + int(i)))))
+        pos += count * k
+        index += count
+
+    if dirty:
+        messages = _correct([job for _, job in dirty], nsym, nsize, fcr, prim, workers, pool)
+        for (offset, _), message in zip(dirty, messages):
+            out[offset:offset + len(message)] = message
+    return out
+
+def rs_encode_batch(data, nsym: int = 32, nsize: int = 255, fcr: int = 0, prim: int = 0x11d,
+                    depth: int = 1) -> bytearray:
+    """
+    Bit-exact get_codec(nsym, nsize).encode(data), with every codeword of
+    data computed in one rs_parity_blocks() call. Shorter messages are
+    zero-prefixed, which leaves their parity unchanged (shortened code).
+    With depth > 1 the message after the last whole group of depth
+    codewords is split evenly across min(depth, its length) codewords
+    instead, ready for interleave() at that depth.
+    Returns the codewords in order.
+    """
+    k = nsize - nsym
+    msg = np.frombuffer(data, dtype=np.uint8)
+    if not len(msg):
+        return bytearray()
+    depth = max(depth, 1)
+    full = len(msg) // (depth * k) * depth  # codewords in whole groups
+    rest = len(msg) - full * k
+    count = min(depth, rest)
+    lengths = [rest // count + (i < rest % count) for i in range(count)] if count else []
+    blocks = np.zeros((full + count, k), dtype=np.uint8)
+    blocks.reshape(-1)[:full * k] = msg[:full * k]
+    pos = full * k
+    for row, n in enumerate(lengths, full):
+        blocks[row, k - n:] = msg[pos:pos + n]
+        pos += n
+    parity = rs_parity_blocks(blocks, nsym, nsize, fcr, prim)
+
+    out = bytearray(len(msg) + len(blocks) * nsym)
+    view = np.frombuffer(out, dtype=np.uint8)
+    body = view[:full * nsize].reshape(full, nsize)
+    body[:, :k] = blocks[:full]
+    body[:, k:] = parity[:full]
+    pos = full * nsize
+    for row, n in enumerate(lengths, full):
+        view[pos:pos + n] = blocks[row, k - n:]
+        view[pos + n:pos + n + nsym] = parity[row]
+        pos += n + nsym
+    return out
+
+def add_ecc(data: bytes, nsym: int = 32, depth: int = 1) -> bytes:
     """
     Append Reed-Solomon parity symbols to `data`.
     nsym = number of parity bytes (tune per required correction strength).
+    depth > 1 interleaves the codewords against burst errors (see interleave()).
     """
-    rs = RSCodec(nsym)
-    return rs.encode(data)
+    return interleave(rs_encode_batch(data, nsym, depth=depth), nsym, depth)
 
-def decode_ecc(encoded: bytes, nsym: int = 32) -> bytes:
+def decode_ecc(encoded: bytes, nsym: int = 32, depth: int = 1, erase_pos=None) -> bytes:
     """
     Decode and correct Reed-Solomon encoded bytes. Returns corrected original bytes.
+    depth must match the one given to add_ecc(); erase_pos are known-bad positions.
     May raise reedsolo.ReedSolomonError if unrecoverable.
     """
-    rs = RSCodec(nsym)
-    decoded = rs.decode(encoded)
+    return rs_decode_batch(encoded, nsym, depth=depth, erase_pos=erase_pos)
+
+def _message(decoded):
     # reedsolo sometimes returns tuple (msg, ecc) depending on version — normalize:
     if isinstance(decoded, tuple):
         return decoded[0]
     return decoded
+
+def decode_ecc_stream(chunks, nsym: int = 32, nsize: int = 255, depth: int = 1, erasures=None,
+                      workers=None, pool=None):
+    """
+    decode_ecc() over an iterable of encoded chunks of any size: whole
+    interleave groups (depth nsize-byte codewords) are decoded as they
+    arrive, so memory stays bounded by the chunk size. Yields the corrected
+    message bytes.
+    erasures may be a list that the chunk source appends arrays of erased
+    stream positions to, before yielding the bytes they belong to
+    (e.g. dna_utils.dna_to_bytes_stream).
+    Every window is corrected on the same process pool: pool if given, else
+    one of workers processes (None: one per core) started with the stream,
+    whose processes only spawn once a window needs them, and shut down
+    when it ends.
+    """
+    workers = workers or os.cpu_count() or 1
+    own = pool is None and workers > 1
+    if own:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        yield from _decode_ecc_windows(chunks, nsym, nsize, depth, erasures, workers, pool)
+    finally:
+        if own:
+            pool.shutdown()
+
+def _decode_ecc_windows(chunks, nsym, nsize, depth, erasures, workers, pool):
+    group = max(depth, 1) * nsize
+    pending = b""
+    consumed = 0
+    held = np.empty(0, dtype=np.int64)
+
+    def erased(end):
+        nonlocal held
+        if erasures:
+            held = np.concatenate([held] + [np.asarray(e, dtype=np.int64) for e in erasures])
+            erasures.clear()
+        mine = held < end
+        positions, held = held[mine] - consumed, held[~mine]
+        return positions
+
+    for chunk in chunks:
+        pending += chunk
+        cut = len(pending) // group * group
+        if cut:
+            yield rs_decode_batch(pending[:cut], nsym, nsize, workers=workers, depth=depth,
+                                  erase_pos=erased(consumed + cut), pool=pool)
+            consumed += cut
+            pending = pending[cut:]
+    if pending:
+        # The last group holds fewer codewords, the last one shorter when the message did not fill it
+        yield rs_decode_batch(pending, nsym, nsize, workers=workers, depth=depth,
+                              erase_pos=erased(consumed + len(pending)), pool=pool)
@@ -0,0 +1,171 @@
+# envelope.py
+"""
+Envelope encryption: every object is encrypted under its own random data
+key (DEK), and only the DEK is encrypted ("wrapped", AES key wrap, RFC 3394)
+under a key-encryption key (KEK) derived from the physical DNA sequence.
+
+Rotating the DNA key therefore only re-wraps the 40-byte wrapped DEKs in
+the metadata records; ciphers are never touched:
+
+  python envelope.py rewrap <old_dna_file> <new_dna_file> <key file or dir>...
+
+Both key-file formats are handled: main.py's compact record (meta_utils,
+wrapped key in FIELD_WRAPPED_KEY) and DNA.py's "name:value" lines
+(wrapped_key_b64), as well as batch.py's .dnab files, which carry their
+wrapped key in the file header.
+"""
+import base64
+import os
+import sys
+
+from cryptography.hazmat.primitives.keywrap import InvalidUnwrap, aes_key_unwrap, aes_key_wrap
+
+from aes_dna import derive_aes_key_from_dna_file
+from meta_utils import dump_meta, load_meta
+
+DATA_KEY_SIZE = 32
+WRAP_ALGORITHM = "AES-KW"
+
+
+def new_data_key() -> bytes:
+    return os.urandom(DATA_KEY_SIZE)
+
+
+def kek_from_dna_file(dna_file_path: str) -> bytes:
+    """KEK for a DNA key file (cached, see aes_dna.derive_aes_key_from_dna_file)."""
+    return derive_aes_key_from_dna_file(dna_file_path, key_bytes=32)
+
+
+def wrap_key(kek: bytes, data_key: bytes) -> bytes:
+    return aes_key_wrap(kek, data_key)
+
+
+def unwrap_key(kek: bytes, wrapped: bytes) -> bytes:
+    """Raises ValueError if wrapped was not made with this KEK (wrong DNA key or corrupted)."""
+    try:
+        return aes_key_unwrap(kek, wrapped)
+    except InvalidUnwrap:
+        raise ValueError("Cannot unwrap data key: wrong DNA key or corrupted metadata.")
+
+
+# =============================
+# === KEY ROTATION ===
+# =============================
+
+def _rewrap_lines(text: str, old_kek: bytes, new_kek: bytes, dna_file: str) -> str:
+    """DNA.py key file: swap wrapped_key_b64 and point dna_file at the new sequence."""
+    lines = text.splitlines()
+    fields = dict(line.split(":", 1) for line in lines if ":" in line)
+    if "wrapped_key_b64" not in fields:
+        raise ValueError("Key file has no wrapped data key (written before envelope encryption).")
+    data_key = unwrap_key(old_kek, base64.b64decode(fields["wrapped_key_b64"].strip()))
+    replaced = {"wrapped_key_b64": base64.b64encode(wrap_key(new_kek, data_key)).decode()}
+    if dna_file:
+        replaced["dna_file"] = dna_file
+    out = []
+    for line in lines:
+        name = line.split(":", 1)[0] if ":" in line else None
+        out.append(f"{name}:{replaced[name]}" if name in replaced else line)
+    return "\n".join(out) + "\n"
+
+
+def rewrap_key_file(path: str, old_kek: bytes, new_kek: bytes, dna_file: str = None):
+    """
+    Re-wrap the data key of one key file from old_kek to new_kek, in place.
+    Compact records that still hold a raw key get it wrapped. dna_file is
+    what the key file should record for the new sequence (DNA.py's
+    dna_file line, meta_utils FIELD_DNA_FILE, the batch header).
+    """
+    # batch.py imports this module for wrap_key() / unwrap_key()
+    from batch import is_batch_file, rewrap_batch_file
+    if is_batch_file(path):
+        rewrap_batch_file(path, old_kek, new_kek, dna_file)
+        return
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(b"algorithm:"):
+        out = _rewrap_lines(data.decode(), old_kek, new_kek, dna_file).encode()
+    else:
+        meta, _ = load_meta(data)
+        if meta.get("wrapped_key"):
+            data_key = unwrap_key(old_kek, meta["wrapped_key"])
+        else:
+            data_key = meta.pop("key")
+        meta["wrapped_key"] = wrap_key(new_kek, data_key)
+        if dna_file:
+            meta["dna_file"] = dna_file
+        out = dump_meta(meta)
+    # Write next to the original and swap, so a crash never leaves a half-written key
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(out)
+    os.replace(tmp, path)
+
+
+# Key files are a few KB at most; anything larger (e.g. Cipher.txt) is not parsed
+KEY_FILE_MAX = 1 << 20
+
+
+def is_key_file(path: str) -> bool:
+    """True for a DNA.py key file or a metadata record meta_utils reads (compact, JSON, legacy)."""
+    if os.path.getsize(path) > KEY_FILE_MAX:
+        return False
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(b"algorithm:"):
+        return True
+    try:
+        meta, _ = load_meta(data)
+    except (ValueError, KeyError, TypeError, AttributeError, SyntaxError, RecursionError, MemoryError):
+        return False
+    return bool(meta.get("key") or meta.get("wrapped_key")) and isinstance(meta.get("codes"), dict)
+
+
+def _key_files(paths):
+    """
+    Paths given as files, and under directories the key files (is_key_file)
+    among the *.txt and the batch files (*.dnab).
+    """
+    from batch import is_batch_file
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, names in os.walk(p):
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    if name.endswith(".txt") and is_key_file(path):
+                        yield path
+                    elif name.endswith(".dnab") and is_batch_file(path):
+                        yield path
+        else:
+            yield p
+
+
+def rewrap(paths, old_dna_file: str, new_dna_file: str, base_dir: str = None) -> dict:
+    """
+    Rotate every key file under paths (files or directories: *.txt key
+    files, *.dnab batch files) from old_dna_file's KEK to new_dna_file's. Other files in the directories
+    (ciphers, notes) are skipped. Returns {path: error} for the key files
+    that could not be re-wrapped; the others are rewritten in place.
+    """
+    old_kek = kek_from_dna_file(old_dna_file)
+    new_kek = kek_from_dna_file(new_dna_file)
+    dna_file = os.path.relpath(new_dna_file, base_dir) if base_dir else new_dna_file
+    failed = {}
+    for path in _key_files(paths):
+        try:
+            rewrap_key_file(path, old_kek, new_kek, dna_file)
+        except (ValueError, KeyError, OSError, SyntaxError) as e:
+            failed[path] = e
+    return failed
+
+
+if __name__ == "__main__":
+    # Usage: python envelope.py rewrap <old_dna_file> <new_dna_file> <key file or dir>...
+    if len(sys.argv) < 5 or sys.argv[1] != "rewrap":
+        print(__doc__)
+        sys.exit(2)
+    from utils import BASE_DIR
+    errors = rewrap(sys.argv[4:], sys.argv[2], sys.argv[3], BASE_DIR)
+    for p, e in errors.items():
+        print(f"skipped: {p}: {e}")
+    sys.exit(1 if errors else 0)
@@ -1,36 +1,93 @@
 import os
-import base64
-import json
-from adaptiveHuffman import compress, decompress
-from aes_utils import aes_encrypt, aes_decrypt
-from ecc_utils import add_ecc, decode_ecc
-from dna_utils import bytes_to_dna, dna_to_bytes
-from utils import CIPHER_PATH, KEY_PATH, DECRYPT_PATH, save_file, load_file
+from adaptiveHuffman import (
+    BLOCK_SIZE,
+    MODE_STORED,
+    choose_mode,
+    compress,
+    compress_blocks,
+    decode_stream,
+    decompress_blocks_stream,
+)
+from aes_stream import AEAD_STREAM, decrypt_stream, encrypt_parallel
+from aes_utils import aes_decrypt_stream
+from batch import encrypt_batch, records_from_file
+from ecc_utils import add_ecc, decode_ecc_stream
+from dna_codec import iter_windows, packed_bytes_stream, packed_from_bytes
+from dna_utils import bytes_to_dna, dna_to_bytes_stream
+from envelope import kek_from_dna_file, new_data_key, unwrap_key, wrap_key
+from meta_utils import DEFAULT_ECC, FORMAT_COMPACT, dump_meta, load_meta
+from utils import (
+    AES_WORKERS, BASE_DIR, BATCH_PATH, CIPHER_PATH, CIPHER_PACKED_PATH, KEY_PATH, DECRYPT_PATH, DNA_KEY_PATH,
+    ECC_INTERLEAVE, PACKED_CIPHER,
+    atomic_output, load_file, map_file, save_file,
+)
+
+
+def encrypt_and_save(data, packed=PACKED_CIPHER, dna_key_path=DNA_KEY_PATH):
+    """
+    Compress -> AES -> ECC -> DNA, then write the cipher and the metadata record.
+    With packed=True the cipher is stored 2 bits per base in Cipher.2bit.
+    The data key is wrapped with the KEK of dna_key_path (envelope.py), which
+    the record names; dna_key_path=None stores the data key itself instead.
+    Raises FileNotFoundError if dna_key_path does not exist.
+    Returns the cipher path written.
+    """
+    if dna_key_path is not None and not os.path.isfile(dna_key_path):
+        raise FileNotFoundError(f"DNA key file not found: {dna_key_path}\nCreate it with your DNA key sequence.")
+    blocks = None
+    codes, extra = {}, 0
+    mode = choose_mode(data)
+    if mode == MODE_STORED:
+        # Already entropy-coded (e.g. JPEG): Huffman would not pay off
+        compressed = data
+    elif len(data) > BLOCK_SIZE:
+        # Large inputs: independent per-block tables, coded across all cores
+        compressed, blocks = compress_blocks(data)
+    else:
+        compressed, codes, extra = compress(data)
+    # Segmented AES-GCM (see aes_stream): segments are sealed across threads
+    key = new_data_key()
+    ciphertext = encrypt_parallel(compressed, key, workers=AES_WORKERS)
+    nsym, nsize, _ = DEFAULT_ECC
+    cipher_with_ecc = add_ecc(ciphertext, nsym, depth=ECC_INTERLEAVE)
+    if packed:
+        cipher_path = CIPHER_PACKED_PATH
+        save_file(cipher_path, packed_from_bytes(cipher_with_ecc))
+    else:
+        cipher_path = CIPHER_PATH
+        save_file(cipher_path, bytes_to_dna(cipher_with_ecc))
+
+    meta = {
+        "aead": AEAD_STREAM,
+        "ecc": (nsym, nsize, ECC_INTERLEAVE),
+        "codes": codes,
+        "extra": extra,
+        "blocks": blocks,
+        "mode": mode,
+        "packed": packed
+    }
+    if dna_key_path is not None:
+        # Envelope encryption: only the wrapped data key is stored (see envelope.py)
+        meta["wrapped_key"] = wrap_key(kek_from_dna_file(dna_key_path), key)
+        meta["dna_file"] = os.path.relpath(dna_key_path, BASE_DIR)
+    else:
+        meta["key"] = key
+    save_file(KEY_PATH, dump_meta(meta))
+    return cipher_path
 
 
 def encrypt_text():
+    if not os.path.isfile(DNA_KEY_PATH):
+        print(f"DNA key file not found: {DNA_KEY_PATH}\nCreate it with your DNA key sequence.")
+        exit(1)
     ans = input("What do you want to encrypt? \nPress 1 for std input, press 2 for file: ").strip()
 
     if ans == "1":
         text = input("Enter your message to encrypt: ").encode()
-        compressed, codes, extra = compress(text)
-        ciphertext, key, nonce, tag = aes_encrypt(compressed)
-        cipher_with_ecc = add_ecc(ciphertext)
-        dna_seq = bytes_to_dna(cipher_with_ecc)
-
-        save_file(CIPHER_PATH, dna_seq)
-
-        meta = {
-            "key": base64.b64encode(key).decode(),
-            "nonce": base64.b64encode(nonce).decode(),
-            "tag": base64.b64encode(tag).decode(),
-            "codes": codes,
-            "extra": extra
-        }
-        save_file(KEY_PATH, json.dumps(meta).encode())
+        cipher_path = encrypt_and_save(text)
 
         print("\nEncryption complete.")
-        print(f"Cipher saved: {CIPHER_PATH}")
+        print(f"Cipher saved: {cipher_path}")
         print(f"Metadata saved: {KEY_PATH}")
 
     elif ans == "2":
@@ -40,118 +97,132 @@ def encrypt_text():
             exit(1)
 
         data = load_file(file_path)
-        compressed, codes, extra = compress(data)
-        ciphertext, key, nonce, tag = aes_encrypt(compressed)
-        cipher_with_ecc = add_ecc(ciphertext)
-        dna_seq = bytes_to_dna(cipher_with_ecc)
-
-        save_file(CIPHER_PATH, dna_seq)
-
-        meta = {
-            "key": base64.b64encode(key).decode(),
-            "nonce": base64.b64encode(nonce).decode(),
-            "tag": base64.b64encode(tag).decode(),
-            "codes": codes,
-            "extra": extra
-        }
-        save_file(KEY_PATH, json.dumps(meta).encode())
+        cipher_path = encrypt_and_save(data)
 
         print("\nEncryption complete.")
-        print(f"Cipher saved: {CIPHER_PATH}")
+        print(f"Cipher saved: {cipher_path}")
         print(f"Key and metadata saved: {KEY_PATH}")
 
     else:
         print("Invalid input!")
 
 
+def encrypt_batch_file():
+    """Encrypt every line of a file as its own record, into one batch file (see batch.py)."""
+    file_path = input("Enter the records file (one record per line): ").strip()
+    if not os.path.isfile(file_path):
+        print("File not found:", file_path)
+        exit(1)
+    if not os.path.isfile(DNA_KEY_PATH):
+        print(f"DNA key file not found: {DNA_KEY_PATH}\nCreate it with your DNA key sequence.")
+        exit(1)
+
+    count = encrypt_batch(records_from_file(file_path), BATCH_PATH)
+    print(f"\nEncryption complete: {count} records.")
+    print(f"Batch saved: {BATCH_PATH}")
+
+
 def load_metadata_safe():
-    """Loads metadata and supports both new JSON format and old binary format."""
+    """
+    Loads metadata as a dict (key or wrapped_key, nonce, tag, aead, mode, packed, codes, extra,
+    and blocks in block mode).
+    Supports the compact record plus the older JSON and legacy binary formats;
+    older files are upgraded to the compact record in place.
+    """
     key_data = load_file(KEY_PATH)
-
-    # Try JSON (new format)
     try:
-        meta = json.loads(key_data)
-        key = base64.b64decode(meta["key"])
-        nonce = base64.b64decode(meta["nonce"])
-        tag = base64.b64decode(meta["tag"])
-        codes = meta["codes"]
-        extra = meta["extra"]
-
-        # 🔽 Convert JSON string keys back to int if needed
-        if isinstance(codes, dict):
-            fixed_codes = {}
-            for k, v in codes.items():
-                try:
-                    fixed_codes[int(k)] = v
-                except ValueError:
-                    fixed_codes[k] = v
-            codes = fixed_codes
-
-        return key, nonce, tag, codes, extra
-
-    except Exception:
-        # Try legacy format (binary + "|" separator)
-        try:
-            parts = key_data.split(b"|")
-            if len(parts) < 5:
-                raise ValueError("Incomplete legacy metadata.")
-
-            key = parts[0]
-            nonce = parts[1]
-            tag = parts[2]
-            codes = eval(parts[3].decode(errors="ignore"))
-            extra = eval(parts[4].decode(errors="ignore"))
-
-            # Auto-upgrade legacy metadata to JSON format
-            meta = {
-                "key": base64.b64encode(key).decode(),
-                "nonce": base64.b64encode(nonce).decode(),
-                "tag": base64.b64encode(tag).decode(),
-                "codes": codes,
-                "extra": extra
-            }
-            save_file(KEY_PATH, json.dumps(meta).encode())
-            print("✅ Legacy metadata detected and upgraded to JSON format.")
-            return key, nonce, tag, codes, extra
-
-        except Exception as e:
-            print("❌ Failed to load metadata (corrupted or incompatible):", e)
-            exit(1)
+        meta, fmt = load_meta(key_data)
+    except Exception as e:
+        print("❌ Failed to load metadata (corrupted or incompatible):", e)
+        exit(1)
 
+    if fmt != FORMAT_COMPACT:
+        save_file(KEY_PATH, dump_meta(meta))
+        print(f"✅ {fmt.upper()} metadata detected and upgraded to compact format.")
+    return meta
+
+
+def data_key(meta):
+    """
+    The payload key of a metadata record, unwrapped with the KEK of the DNA
+    key file the record names when enveloped (DNA_KEY_PATH if it names none).
+    """
+    if meta.get("wrapped_key"):
+        dna_file = meta.get("dna_file", DNA_KEY_PATH)
+        if not os.path.isabs(dna_file):
+            dna_file = os.path.join(BASE_DIR, dna_file)
+        return unwrap_key(kek_from_dna_file(dna_file), meta["wrapped_key"])
+    return meta["key"]
+
+
+def decrypted_chunks(cipher, meta, key):
+    """
+    Yield the plaintext for a mapped cipher file, window by window:
+    DNA -> ECC -> AES -> decompress, each stage streaming into the next, so
+    memory stays bounded whatever the cipher size. Segmented payloads are
+    authenticated segment by segment; single-call AES-GCM ones after the
+    last window.
+    """
+    erasures = []  # bytes hit by non-ACGT symbols, corrected as RS erasures
+    if meta.get("packed"):
+        # Packed bases are already the ECC bytes: windows are zero-copy slices.
+        # The CRC is not checked: RS below corrects what it would reject.
+        cipher_with_ecc = packed_bytes_stream(cipher, verify=False)
+    else:
+        cipher_with_ecc = dna_to_bytes_stream(iter_windows(cipher), erasures)
+    nsym, nsize, depth = meta.get("ecc", DEFAULT_ECC)
+    corrected = decode_ecc_stream(cipher_with_ecc, nsym, nsize, depth, erasures)
+    if meta.get("aead") == AEAD_STREAM:
+        decrypted = decrypt_stream(corrected, key)
+    else:
+        decrypted = aes_decrypt_stream(corrected, key, meta["nonce"], meta["tag"])
+    if meta.get("mode") == MODE_STORED:
+        return decrypted
+    elif meta.get("blocks"):
+        return decompress_blocks_stream(decrypted, meta["blocks"])
+    else:
+        return decode_stream(decrypted, meta["codes"], meta["extra"])
 
 
 def decrypt_text_or_image(ans):
-    if not os.path.isfile(CIPHER_PATH):
-        print("File not found:", CIPHER_PATH)
-        exit(1)
+    if ans == "1":
+        out_name, label = "PlainTextResult.txt", "message"
+    elif ans == "2":
+        out_name, label = "DecodedImage.png", "image"
+    else:
+        print("Invalid input!")
+        return
+
     if not os.path.isfile(KEY_PATH):
         print("File not found:", KEY_PATH)
         exit(1)
 
-    key, nonce, tag, codes, extra = load_metadata_safe()
-
-    dna_seq = load_file(CIPHER_PATH).decode()
-    cipher_with_ecc = dna_to_bytes(dna_seq)
-    corrected = decode_ecc(cipher_with_ecc)
-    decrypted = aes_decrypt(corrected, key, nonce, tag)
-    plain = decompress(decrypted, codes, extra)
+    meta = load_metadata_safe()
+    try:
+        key = data_key(meta)
+    except (ValueError, FileNotFoundError) as e:
+        print("❌", e)
+        exit(1)
+    cipher_path = CIPHER_PACKED_PATH if meta.get("packed") else CIPHER_PATH
+    if not os.path.isfile(cipher_path):
+        print("File not found:", cipher_path)
+        exit(1)
 
-    if ans == "1":
-        save_file(DECRYPT_PATH + "PlainTextResult.txt", plain)
-        print(f"\nDecryption complete.\nDecoded message saved to '{DECRYPT_PATH}PlainTextResult.txt'")
-    elif ans == "2":
-        save_file(DECRYPT_PATH + "DecodedImage.png", plain)
-        print(f"\nDecryption complete.\nDecoded image saved to '{DECRYPT_PATH}DecodedImage.png'")
-    else:
-        print("Invalid input!")
+    # The output only replaces an earlier result once every AES tag has verified
+    with map_file(cipher_path) as cipher, atomic_output(DECRYPT_PATH + out_name) as out:
+        for piece in decrypted_chunks(cipher, meta, key):
+            out.write(piece)
+    print(f"\nDecryption complete.\nDecoded {label} saved to '{DECRYPT_PATH}{out_name}'")
 
 
 if __name__ == "__main__":
     print("Encrypt or decrypt a message?")
-    EncrypOrDecrypt = input("Press 1 for encryption, press 2 for decryption: ").strip()
+    EncrypOrDecrypt = input("Press 1 for encryption, press 2 for decryption, press 3 for batch encryption: ").strip()
 
     if EncrypOrDecrypt == "1":
         encrypt_text()
+    elif EncrypOrDecrypt == "3":
+        encrypt_batch_file()
     elif EncrypOrDecrypt == "2":
         ans = input("What do you want to decrypt? \nPress 1 for .txt file, press 2 for image file: ").strip()
         decrypt_text_or_image(ans)
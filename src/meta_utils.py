@@ -0,0 +1,292 @@
+# meta_utils.py
+"""
+Compact, versioned metadata record for key/Key.txt.
+
+Record layout (v1):
+  b"DNAK" | version (1 byte) | fields...
+  field = tag (1 byte) | length (4 bytes, big-endian) | value
+
+Huffman codebooks are canonical, so only the code length of each symbol is
+stored (byte i = length of symbol i, trailing zeros trimmed: <= 256 bytes).
+Block-mode payloads store one such length table per block, with the block's
+compressed size and padding. Stored (uncompressed) payloads carry no tables.
+FIELD_PACKED marks a cipher written as packed 2-bit bases (Cipher.2bit).
+FIELD_AEAD records how the payload was sealed (aes_stream.AEAD_*); for
+segmented payloads the nonce lives in the stream header, so nonce and tag
+are empty. With envelope encryption the data key is stored wrapped by the
+DNA-derived KEK (FIELD_WRAPPED_KEY, see envelope.py) instead of FIELD_KEY,
+and FIELD_DNA_FILE names the DNA key file that KEK comes from (relative to
+the repository root unless absolute).
+FIELD_ECC records the Reed-Solomon geometry (nsym, codeword size,
+interleave depth); records without it used DEFAULT_ECC.
+Key.txt holds the record base64-encoded on a single line.
+
+Older key files (JSON with a full "codes" dict, or the legacy "|"-separated
+binary) are still readable and can be rewritten with migrate_key_file().
+Their codebooks are usually not canonical, so those are kept verbatim in a
+FIELD_CODEBOOK entry instead of being reduced to lengths.
+"""
+import ast
+import base64
+import binascii
+import json
+import struct
+import sys
+
+from adaptiveHuffman import MODE_HUFFMAN, MODE_STORED, canonical_codes, code_lengths, is_canonical
+from aes_stream import AEAD_GCM
+
+MAGIC = b"DNAK"
+VERSION = 1
+
+FIELD_KEY = 1
+FIELD_NONCE = 2
+FIELD_TAG = 3
+FIELD_EXTRA = 4
+FIELD_LENGTHS = 5
+FIELD_CODEBOOK = 6
+FIELD_BLOCKS = 7
+FIELD_MODE = 8
+FIELD_PACKED = 9
+FIELD_AEAD = 10
+FIELD_WRAPPED_KEY = 11
+FIELD_ECC = 12
+FIELD_DNA_FILE = 13
+
+# (nsym, nsize, interleave depth) of ecc_utils.add_ecc() before FIELD_ECC
+DEFAULT_ECC = (32, 255, 1)
+
+_FIELD_HEADER = struct.Struct(">BI")
+_BLOCK_HEADER = struct.Struct(">IBH")
+_ECC = struct.Struct(">HHH")
+
+FORMAT_COMPACT = "compact"
+FORMAT_JSON = "json"
+FORMAT_LEGACY = "legacy"
+
+
+# =============================
+# === CODEBOOK FIELDS ===
+# =============================
+
+def _pack_lengths(lengths: dict) -> bytes:
+    """{symbol: code length} as one byte per symbol, trailing zeros trimmed."""
+    out = bytearray(256)
+    for sym, length in lengths.items():
+        out[sym] = length
+    return bytes(out).rstrip(b"\x00")
+
+
+def _unpack_lengths(value) -> dict:
+    return {sym: length for sym, length in enumerate(value) if length}
+
+
+def _pack_blocks(blocks) -> bytes:
+    """Block-mode table: count, then (compressed size, extra, lengths) per block."""
+    out = bytearray(struct.pack(">I", len(blocks)))
+    for size, lengths, extra in blocks:
+        packed = _pack_lengths(lengths)
+        out += _BLOCK_HEADER.pack(size, extra, len(packed))
+        out += packed
+    return bytes(out)
+
+
+def _unpack_blocks(value) -> list:
+    (count,) = struct.unpack_from(">I", value, 0)
+    blocks = []
+    pos = 4
+    for _ in range(count):
+        size, extra, nlen = _BLOCK_HEADER.unpack_from(value, pos)
+        pos += _BLOCK_HEADER.size
+        blocks.append((size, _unpack_lengths(value[pos:pos + nlen]), extra))
+        pos += nlen
+    return blocks
+
+
+def _pack_codebook(codes) -> bytes:
+    """Explicit (symbol, length, code bits) triples for non-canonical codebooks."""
+    out = bytearray()
+    for sym, code in sorted(codes.items()):
+        nbytes = (len(code) + 7) // 8
+        out += bytes((sym, len(code)))
+        out += int(code, 2).to_bytes(nbytes, "big")
+    return bytes(out)
+
+
+def _unpack_codebook(value) -> dict:
+    codes = {}
+    i = 0
+    while i < len(value):
+        sym, length = value[i], value[i + 1]
+        nbytes = (length + 7) // 8
+        code = int.from_bytes(value[i + 2:i + 2 + nbytes], "big")
+        codes[sym] = format(code, f"0{length}b")
+        i += 2 + nbytes
+    return codes
+
+
+# =============================
+# === RECORD ENCODE / DECODE ===
+# =============================
+
+def pack_meta(meta: dict) -> bytes:
+    """
+    Serialize a metadata dict to a binary record: key (or wrapped key), nonce, tag, payload mode,
+    then either codes + extra (single table) or blocks (block mode, see
+    compress_blocks). Stored-mode payloads carry no tables.
+    """
+    if meta.get("wrapped_key"):
+        fields = [(FIELD_WRAPPED_KEY, meta["wrapped_key"])]
+        if meta.get("dna_file"):
+            fields.append((FIELD_DNA_FILE, meta["dna_file"].encode("utf-8")))
+    else:
+        fields = [(FIELD_KEY, meta["key"])]
+    fields += [
+        (FIELD_NONCE, meta.get("nonce", b"")),
+        (FIELD_TAG, meta.get("tag", b"")),
+    ]
+    mode = meta.get("mode", MODE_HUFFMAN)
+    fields.append((FIELD_MODE, bytes((mode,))))
+    if meta.get("packed"):
+        fields.append((FIELD_PACKED, b"\x01"))
+    if meta.get("aead", AEAD_GCM) != AEAD_GCM:
+        fields.append((FIELD_AEAD, bytes((meta["aead"],))))
+    if tuple(meta.get("ecc", DEFAULT_ECC)) != DEFAULT_ECC:
+        fields.append((FIELD_ECC, _ECC.pack(*meta["ecc"])))
+    if mode == MODE_STORED:
+        pass  # payload is not compressed, no tables needed
+    elif meta.get("blocks") is not None:
+        fields.append((FIELD_BLOCKS, _pack_blocks(meta["blocks"])))
+    else:
+        codes = meta["codes"]
+        fields.append((FIELD_EXTRA, bytes((meta["extra"],))))
+        if is_canonical(codes):
+            fields.append((FIELD_LENGTHS, _pack_lengths(code_lengths(codes))))
+        else:
+            fields.append((FIELD_CODEBOOK, _pack_codebook(codes)))
+
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    for tag, value in fields:
+        out += _FIELD_HEADER.pack(tag, len(value))
+        out += value
+    return bytes(out)
+
+
+def unpack_meta(record: bytes) -> dict:
+    """Parse a binary record produced by pack_meta()."""
+    view = memoryview(record)
+    if bytes(view[:4]) != MAGIC:
+        raise ValueError("Not a DNAK metadata record.")
+    if view[4] > VERSION:
+        raise ValueError(f"Unsupported metadata version: {view[4]}")
+
+    meta = {"codes": {}, "extra": 0, "blocks": None, "mode": MODE_HUFFMAN, "packed": False,
+            "aead": AEAD_GCM, "ecc": DEFAULT_ECC}
+    pos = 5
+    while pos < len(view):
+        tag, length = _FIELD_HEADER.unpack_from(view, pos)
+        pos += _FIELD_HEADER.size
+        value = bytes(view[pos:pos + length])
+        pos += length
+        if tag == FIELD_KEY:
+            meta["key"] = value
+        elif tag == FIELD_NONCE:
+            meta["nonce"] = value
+        elif tag == FIELD_TAG:
+            meta["tag"] = value
+        elif tag == FIELD_EXTRA:
+            meta["extra"] = value[0]
+        elif tag == FIELD_LENGTHS:
+            meta["codes"] = canonical_codes(_unpack_lengths(value))
+        elif tag == FIELD_CODEBOOK:
+            meta["codes"] = _unpack_codebook(value)
+        elif tag == FIELD_BLOCKS:
+            meta["blocks"] = _unpack_blocks(value)
+        elif tag == FIELD_MODE:
+            meta["mode"] = value[0]
+        elif tag == FIELD_PACKED:
+            meta["packed"] = bool(value[0])
+        elif tag == FIELD_AEAD:
+            meta["aead"] = value[0]
+        elif tag == FIELD_WRAPPED_KEY:
+            meta["wrapped_key"] = value
+        elif tag == FIELD_ECC:
+            meta["ecc"] = _ECC.unpack(value)
+        elif tag == FIELD_DNA_FILE:
+            meta["dna_file"] = value.decode("utf-8")
+        # unknown tags are skipped so newer writers stay readable
+    return meta
+
+
+def dump_meta(meta: dict) -> bytes:
+    """Key.txt contents: the binary record as one base64 line."""
+    return base64.b64encode(pack_meta(meta)) + b"\n"
+
+
+# =============================
+# === LOADING / MIGRATION ===
+# =============================
+
+def _load_json(data: bytes) -> dict:
+    raw = json.loads(data)
+    codes = {}
+    for k, v in raw["codes"].items():
+        codes[int(k)] = v
+    return {
+        "key": base64.b64decode(raw["key"]),
+        "nonce": base64.b64decode(raw["nonce"]),
+        "tag": base64.b64decode(raw["tag"]),
+        "codes": codes,
+        "extra": raw["extra"],
+    }
+
+
+def _load_legacy(data: bytes) -> dict:
+    parts = data.split(b"|")
+    if len(parts) < 5:
+        raise ValueError("Incomplete legacy metadata.")
+    return {
+        "key": parts[0],
+        "nonce": parts[1],
+        "tag": parts[2],
+        "codes": ast.literal_eval(parts[3].decode(errors="ignore")),
+        "extra": ast.literal_eval(parts[4].decode(errors="ignore")),
+    }
+
+
+def load_meta(data: bytes):
+    """
+    Parse Key.txt contents in any supported format.
+    Returns (meta, format) where format is FORMAT_COMPACT, FORMAT_JSON or FORMAT_LEGACY.
+    """
+    if data[:4] == MAGIC:
+        return unpack_meta(data), FORMAT_COMPACT
+    if data[:1] != b"{":
+        try:
+            record = base64.b64decode(data.strip(), validate=True)
+        except (binascii.Error, ValueError):
+            record = b""
+        if record[:4] == MAGIC:
+            return unpack_meta(record), FORMAT_COMPACT
+    try:
+        return _load_json(data), FORMAT_JSON
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return _load_legacy(data), FORMAT_LEGACY
+
+
+def migrate_key_file(path: str) -> bool:
+    """Rewrite a JSON or legacy key file as a compact record. Returns True if rewritten."""
+    with open(path, "rb") as f:
+        meta, fmt = load_meta(f.read())
+    if fmt == FORMAT_COMPACT:
+        return False
+    with open(path, "wb") as f:
+        f.write(dump_meta(meta))
+    return True
+
+
+if __name__ == "__main__":
+    # Usage: python meta_utils.py key1.txt key2.txt ...
+    for p in sys.argv[1:]:
+        print(("migrated: " if migrate_key_file(p) else "up to date: ") + p)
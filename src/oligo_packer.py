@@ -2,70 +2,140 @@
 import os
 import json
 import hashlib
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
 from ecc_rs import rs_encode, rs_decode
-from dna_codec import bytes_to_dna, dna_to_bytes, has_long_homopolymer, gc_content
+from ecc_utils import rs_parity_blocks
+from dna_codec import decode_dna, encode_table, screen_oligos
+
+# Oligos per process pool job: large enough that IPC stays small next to the RS and DNA work
+JOB_OLIGOS = 4096
+# Candidate masks per block: 0 leaves it as is, k > 0 XORs it with SHAKE-256(SCRAMBLER_SEED | k).
+# They are screened SCRAMBLER_ROUND at a time, only for blocks with no passing mask yet.
+SCRAMBLERS = 256
+SCRAMBLER_ROUND = 16
+SCRAMBLER_SEED = b"oligo_packer.scrambler"
 
 def checksum16(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()[:8]
 
-def pack_into_oligos(ciphertext_bytes: bytes, oligo_data_size_bytes: int = 60, nsym: int = 20,
-                     max_run: int = 3, gc_low: float = 0.40, gc_high: float = 0.60,
-                     max_attempts: int = 5):
+@lru_cache(maxsize=None)
+def scrambler_mask(index: int, size: int) -> np.ndarray:
+    """First size bytes of scrambler mask index (all zeros for index 0), read-only uint8 array."""
+    if index == 0:
+        mask = np.zeros(size, dtype=np.uint8)
+    else:
+        stream = hashlib.shake_256(SCRAMBLER_SEED + index.to_bytes(2, "big")).digest(size)
+        mask = np.frombuffer(stream, dtype=np.uint8)
+    mask.flags.writeable = False
+    return mask
+
+def _codewords(blocks: np.ndarray, nsym: int) -> np.ndarray:
+    """(rows, length + nsym) RS codewords of a 2-D uint8 array of equal-length messages."""
+    return np.hstack([blocks, rs_parity_blocks(blocks, nsym)])
+
+@lru_cache(maxsize=None)
+def _mask_codewords(scramblers: int, size: int, nsym: int) -> np.ndarray:
+    return _codewords(np.stack([scrambler_mask(k, size) for k in range(scramblers)]), nsym)
+
+def _scramble(blocks: np.ndarray, nsym: int, scramblers: int, max_run: int, gc_low: float, gc_high: float):
     """
-    Chunk ciphertext_bytes into blocks, RS-encode each block (nsym parity),
-    create DNA for each block, check constraints and attempt small tweaks if needed.
-    Returns a list of oligo dicts: {"id":i,"dna":..., "meta":{...}}
+    Codeword and DNA of every equal-length message in blocks, each XORed with
+    the first scrambler mask whose DNA passes the constraints. RS is linear,
+    so codeword(block ^ mask) = codeword(block) ^ codeword(mask): one RS
+    encode per block, and candidates are plain XORs, screened SCRAMBLER_ROUND
+    masks at a time in one vectorized pass over the rows still failing.
+    Rows without a passing candidate take the one closest to the limits.
+    Returns (codewords, ASCII DNA rows, mask index per row).
     """
-    total = len(ciphertext_bytes)
-    chunks = [ciphertext_bytes[i:i+oligo_data_size_bytes] for i in range(0, total, oligo_data_size_bytes)]
+    rows, size = blocks.shape
+    encoded = _codewords(blocks, nsym)
+    masks = _mask_codewords(scramblers, size, nsym)
+    # 4 ASCII bases of a byte as one uint32: gathers a quarter of the elements
+    words = encode_table().view(np.uint32)[:, 0]
+    chosen = np.zeros(rows, dtype=np.int64)
+    best = np.full(rows, np.inf)
+    pending = np.arange(rows)
+    for start in range(0, scramblers, SCRAMBLER_ROUND):
+        round_masks = masks[start:start + SCRAMBLER_ROUND]
+        candidates = encoded[pending][None] ^ round_masks[:, None]
+        dna = words[candidates].view(np.uint8).reshape(candidates.shape[0] * len(pending), -1)
+        _, diagnostics = screen_oligos(dna, max_run=max_run, gc_low=gc_low, gc_high=gc_high)
+        gc = diagnostics["gc"]
+        violation = (np.maximum(diagnostics["max_run"] - max_run, 0)
+                     + np.maximum(gc_low - gc, 0) + np.maximum(gc - gc_high, 0)).reshape(len(round_masks), -1)
+        first = violation.argmin(axis=0)
+        lowest = violation[first, np.arange(len(pending))]
+        better = lowest < best[pending]
+        best[pending[better]] = lowest[better]
+        chosen[pending[better]] = start + first[better]
+        pending = pending[best[pending] > 0]
+        if not len(pending):
+            break
+    codewords = encoded ^ masks[chosen]
+    return codewords, words[codewords].view(np.uint8), chosen
+
+def _pack_range(args):
+    """Oligos for one contiguous run of chunks; ids start at first_id (process pool worker)."""
+    data, first_id, oligo_data_size_bytes, nsym, max_run, gc_low, gc_high, scramblers = args
+    arr = np.frombuffer(data, dtype=np.uint8)
+    full = len(arr) // oligo_data_size_bytes * oligo_data_size_bytes
+    # full-size chunks, then the shorter last one: each group shares one set of mask codewords
+    groups = [arr[:full].reshape(-1, oligo_data_size_bytes)]
+    if full < len(arr):
+        groups.append(arr[full:].reshape(1, -1))
     oligos = []
-    for i, chunk in enumerate(chunks):
-        attempt = 0
-        success = False
-        last_exception = None
-        # we attempt to encode and satisfy constraints
-        while attempt < max_attempts and not success:
-            # optionally vary a tiny tweak: XOR first byte with attempt value to change bits deterministically
-            if attempt == 0:
-                block = chunk
-                tweak = None
-            else:
-                # create a small tweak but keep reversible: store tweak byte in meta
-                tweak = attempt & 0xFF
-                block = bytes([chunk[0] ^ tweak]) + chunk[1:]
-            try:
-                encoded = rs_encode(block, nsym=nsym)
-                dna = bytes_to_dna(encoded)
-                # check constraints
-                if has_long_homopolymer(dna, max_run=max_run) or not (gc_low <= gc_content(dna) <= gc_high):
-                    attempt += 1
-                    continue
-                meta = {
-                    "chunk_index": i,
-                    "orig_len": len(chunk),
-                    "rs_nsym": nsym,
-                    "checksum": checksum16(encoded),
-                    "tweak": tweak
-                }
-                oligos.append({"id": i, "dna": dna, "meta": meta})
-                success = True
-            except Exception as e:
-                last_exception = e
-                attempt += 1
-        if not success:
-            # as fallback accept the last encoded dna even if constraints fail (but record attempted tweak)
-            encoded = rs_encode(chunk, nsym=nsym)
-            dna = bytes_to_dna(encoded)
+    for blocks in groups:
+        if not len(blocks):
+            continue
+        encoded, dna, chosen = _scramble(blocks, nsym, scramblers, max_run, gc_low, gc_high)
+        for codeword, bases, scrambler in zip(encoded, dna, chosen.tolist()):
+            i = first_id + len(oligos)
             meta = {
                 "chunk_index": i,
-                "orig_len": len(chunk),
+                "orig_len": blocks.shape[1],
                 "rs_nsym": nsym,
-                "checksum": checksum16(encoded),
-                "tweak": None
+                "checksum": checksum16(codeword.tobytes()),
+                "scrambler": scrambler
             }
-            oligos.append({"id": i, "dna": dna, "meta": meta})
+            oligos.append({"id": i, "dna": bases.tobytes().decode("ascii"), "meta": meta})
     return oligos
 
+def _run_jobs(fn, jobs, workers):
+    """fn over jobs in order, across a process pool unless there is one job or one worker."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        return [fn(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(fn, jobs))
+
+def pack_into_oligos(ciphertext_bytes: bytes, oligo_data_size_bytes: int = 60, nsym: int = 20,
+                     max_run: int = 3, gc_low: float = 0.40, gc_high: float = 0.60,
+                     max_attempts: int = None, scramblers: int = SCRAMBLERS, workers=None):
+    """
+    Chunk ciphertext_bytes into blocks, RS-encode each block (nsym parity),
+    and create DNA for each block, whitened with the first of scramblers
+    seeded masks (meta "scrambler") whose DNA meets the constraints.
+    Constraints are screened for the whole pool at once (dna_codec.screen_oligos).
+    Runs of JOB_OLIGOS chunks are packed across a process pool (workers=None:
+    one process per core); ids and order do not depend on workers.
+    max_attempts (the old first-byte tweak retries) is deprecated and ignored.
+    Returns a list of oligo dicts: {"id":i,"dna":..., "meta":{...}}
+    """
+    if max_attempts is not None:
+        warnings.warn("pack_into_oligos(max_attempts=...) is ignored: blocks are whitened with "
+                      "one of scramblers masks instead of tweaked and retried.",
+                      DeprecationWarning, stacklevel=2)
+    step = JOB_OLIGOS * oligo_data_size_bytes
+    view = memoryview(ciphertext_bytes).cast("B")
+    jobs = [(bytes(view[i:i+step]), i // oligo_data_size_bytes, oligo_data_size_bytes, nsym,
+             max_run, gc_low, gc_high, scramblers) for i in range(0, len(view), step)]
+    return [o for part in _run_jobs(_pack_range, jobs, workers) for o in part]
+
 def save_manifest(oligos, out_path):
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
     with open(out_path, "w") as f:
@@ -75,17 +145,22 @@ def load_manifest(path):
     with open(path, "r") as f:
         return json.load(f)
 
-def unpack_oligos(oligo_list):
-    """
-    oligo_list: list of dicts {"id":..., "dna":..., "meta":{...}}
-    returns concatenated ciphertext bytes (original chunks)
-    """
+def _unpack_range(oligo_list):
+    """Ciphertext of a run of oligos already sorted by id (process pool worker)."""
     parts = []
-    for o in sorted(oligo_list, key=lambda x: x["id"]):
-        encoded = dna_to_bytes(o["dna"])
-        # if a tweak was applied, reverse it after RS decode
-        decoded = rs_decode(encoded, nsym=o["meta"]["rs_nsym"])
+    for o in oligo_list:
+        nsym = o["meta"]["rs_nsym"]
+        encoded, erased = decode_dna(o["dna"], erase=True)
+        if not len(erased) and checksum16(encoded) == o["meta"].get("checksum"):
+            decoded = encoded[:-nsym]
+        else:
+            decoded = rs_decode(encoded, nsym=nsym, erase_pos=erased.tolist())
+            if "checksum" in o["meta"] and checksum16(rs_encode(decoded, nsym=nsym)) != o["meta"]["checksum"]:
+                raise ValueError(f"Oligo {o['id']}: checksum mismatch after RS correction.")
+        # undo the scrambler mask (or, in older manifests, the first-byte tweak) after RS decode
         orig_len = o["meta"]["orig_len"]
+        if o["meta"].get("scrambler"):
+            decoded = (np.frombuffer(decoded, dtype=np.uint8) ^ scrambler_mask(o["meta"]["scrambler"], len(decoded))).tobytes()
         if o["meta"].get("tweak") is not None:
             tweak = o["meta"]["tweak"]
             # reverse tweak applied earlier
@@ -94,3 +169,17 @@ def unpack_oligos(oligo_list):
         # trim to original length
         parts.append(decoded[:orig_len])
     return b"".join(parts)
+
+def unpack_oligos(oligo_list, workers=None):
+    """
+    oligo_list: list of dicts {"id":..., "dna":..., "meta":{...}}
+    returns concatenated ciphertext bytes (original chunks)
+    Oligos that match their checksum skip RS decoding. The others are
+    corrected with the bytes hit by non-ACGT symbols (N, lowercase, ...)
+    passed as erasures, and must match their checksum after correction.
+    Runs of JOB_OLIGOS oligos are decoded across a process pool
+    (workers=None: one process per core).
+    """
+    ordered = sorted(oligo_list, key=lambda x: x["id"])
+    jobs = [ordered[i:i+JOB_OLIGOS] for i in range(0, len(ordered), JOB_OLIGOS)]
+    return b"".join(_run_jobs(_unpack_range, jobs, workers))
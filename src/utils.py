@@ -1,6 +1,8 @@
 # utils.py
+import mmap
 import os
 import random
+from contextlib import contextmanager
 
 # =============================
 # === PATH CONFIGURATIONS ===
@@ -10,7 +12,20 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
 KEY_PATH = os.path.join(BASE_DIR, "key", "Key.txt")
 CIPHER_PATH = os.path.join(BASE_DIR, "cipher", "Cipher.txt")
+CIPHER_PACKED_PATH = os.path.join(BASE_DIR, "cipher", "Cipher.2bit")
+BATCH_PATH = os.path.join(BASE_DIR, "cipher", "Batch.dnab")  # batch.py output (main menu option 3)
 DECRYPT_PATH = os.path.join(BASE_DIR, "decrypted")
+DNA_KEY_PATH = os.path.join(BASE_DIR, "dna_sequence.txt")  # physical DNA key: wraps the data keys
+
+# Write the cipher as packed 2-bit bases (Cipher.2bit) instead of ASCII text
+PACKED_CIPHER = False
+
+# Threads for segment-parallel AES-GCM (None: one per core)
+AES_WORKERS = None
+
+# Reed-Solomon codewords interleaved per group, so a burst of sequencing
+# errors is spread across codewords (ecc_utils.interleave; 1: off)
+ECC_INTERLEAVE = 16
 
 # Auto-create directories if not present
 os.makedirs(os.path.dirname(KEY_PATH), exist_ok=True)
@@ -84,6 +99,43 @@ def load_file(path: str) -> bytes:
     with open(path, "rb") as f:
         return f.read()
 
+@contextmanager
+def map_file(path: str):
+    """
+    Read-only mmap of a file, for decoders that walk it in windows: the OS
+    pages it in on demand, so it is never copied into Python memory.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""  # empty files cannot be mapped
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)  # read-ahead, and pages behind may be dropped
+    try:
+        yield mm
+    finally:
+        try:
+            mm.close()
+        except BufferError:
+            pass  # a view is still referenced (e.g. from a traceback); freed with it
+
+@contextmanager
+def atomic_output(path: str):
+    """
+    Binary file object for path that only replaces path once the block
+    succeeds, so streamed output that later fails verification is never left behind.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".part"
+    try:
+        with open(tmp, "wb") as f:
+            yield f
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
 # =============================
 # === OPTIONAL: RANDOM DNA KEY SEED ===
 # =============================
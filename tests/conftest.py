@@ -0,0 +1,6 @@
+# conftest.py
+# The modules in src/ import each other by bare name (they are run from src/).
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,172 @@
+# test_adaptiveHuffman.py
+import heapq
+import io
+import os
+import random
+
+import numpy as np
+import pytest
+
+from adaptiveHuffman import (
+    MAX_CODE_LEN,
+    AdaptiveHuffman,
+    canonical_codes,
+    compress,
+    compress_blocks,
+    decode_bytes,
+    decode_stream,
+    decompress,
+    decompress_blocks,
+    decompress_blocks_stream,
+    huffman_lengths,
+)
+
+# Incomplete codebook: no code starts with "11"
+PARTIAL_CODES = {65: "0", 66: "10"}
+
+
+def _heap_cost(weights) -> int:
+    """Total coded bits of a plain heap-built Huffman code."""
+    heap = list(weights)
+    heapq.heapify(heap)
+    cost = 0
+    while len(heap) > 1:
+        merged = heapq.heappop(heap) + heapq.heappop(heap)
+        cost += merged
+        heapq.heappush(heap, merged)
+    return cost
+
+
+def _freq(weights) -> np.ndarray:
+    freq = np.zeros(256, dtype=np.int64)
+    freq[:len(weights)] = weights
+    return freq
+
+
+def _kraft(lengths: dict) -> float:
+    return sum(2.0 ** -length for length in lengths.values())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_two_queue_lengths_are_optimal(seed):
+    rng = random.Random(seed)
+    weights = [rng.randint(1, 1000) for _ in range(rng.randint(2, 256))]
+    lengths = huffman_lengths(_freq(weights))
+    assert sum(weights[sym] * length for sym, length in lengths.items()) == _heap_cost(weights)
+    assert _kraft(lengths) == 1.0
+
+
+def test_package_merge_limits_code_length():
+    # Fibonacci weights make the unlimited code 24 bits deep
+    weights = [1, 1]
+    while len(weights) < 25:
+        weights.append(weights[-1] + weights[-2])
+    unlimited = huffman_lengths(_freq(weights), max_len=64)
+    assert max(unlimited.values()) > MAX_CODE_LEN
+    limited = huffman_lengths(_freq(weights))
+    assert max(limited.values()) == MAX_CODE_LEN
+    assert _kraft(limited) <= 1.0
+    cost = sum(weights[sym] * length for sym, length in limited.items())
+    assert cost >= _heap_cost(weights)
+    data = bytes(sym for sym, w in enumerate(weights) for _ in range(min(w, 50)))
+    assert decode_bytes(*compress(data)) == data
+
+
+def test_degenerate_frequency_tables():
+    assert huffman_lengths(np.zeros(256, dtype=np.int64)) == {}
+    assert huffman_lengths(_freq([0, 7])) == {1: 1}
+    assert compress(b"") == (b"", {}, 0)
+    encoded, codes, extra = compress(b"\x00" * 100)
+    assert codes == {0: "0"}
+    assert decode_bytes(encoded, codes, extra) == b"\x00" * 100
+
+
+@pytest.mark.parametrize("data", [b"abracadabra", os.urandom(5000), "héllo wörld".encode(), bytes(range(256)) * 3])
+def test_round_trip_and_canonical_codes(data):
+    encoded, codes, extra = compress(data)
+    assert codes == canonical_codes({sym: len(code) for sym, code in codes.items()})
+    assert 1 <= extra <= 8
+    out = decompress(encoded, codes, extra)
+    assert (out.encode("utf-8") if isinstance(out, str) else out) == data
+    pieces = [encoded[i:i + 7] for i in range(0, len(encoded), 7)]
+    assert b"".join(decode_stream(pieces, codes, extra)) == data
+
+
+def test_unknown_code_is_reported_as_corrupt_data():
+    with pytest.raises(ValueError, match="not in the codebook"):
+        decode_bytes(b"\xff\x00", PARTIAL_CODES, 0)
+
+
+def test_unknown_code_in_the_last_byte_is_reported():
+    with pytest.raises(ValueError, match="not in the codebook"):
+        decode_bytes(b"\x00\xc0", PARTIAL_CODES, 4)
+
+
+def test_caller_errors_are_not_reported_as_corrupt_data():
+    encoded, codes, extra = compress(b"abracadabra")
+    with pytest.raises(TypeError):
+        list(decode_stream([encoded.decode("latin-1")], codes, extra))
+
+
+# --- block mode ---
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("n", [1, 999, 1000, 4321])
+def test_block_round_trip(n, workers):
+    data = bytes(random.Random(n).choices(b"ACGT acgt\n", k=n))
+    compressed, blocks = compress_blocks(data, block_size=1000, workers=workers)
+    assert len(blocks) == -(-n // 1000)
+    assert sum(size for size, _, _ in blocks) == len(compressed)
+    assert decompress_blocks(compressed, blocks, workers=workers).encode() == data
+    chunks = [compressed[i:i + 333] for i in range(0, len(compressed), 333)]
+    assert b"".join(decompress_blocks_stream(chunks, blocks, workers=workers)) == data
+
+
+def test_block_stream_reports_a_missing_block():
+    compressed, blocks = compress_blocks(os.urandom(3000), block_size=1000, workers=1)
+    with pytest.raises(ValueError, match="last block"):
+        list(decompress_blocks_stream([compressed[:-1]], blocks, workers=1))
+
+
+# --- one-pass adaptive Huffman (FGK) ---
+
+FGK_DATA = b"one-pass adaptive huffman " * 50 + bytes(range(256))
+
+
+def _fgk_compressed() -> bytes:
+    out = io.BytesIO()
+    AdaptiveHuffman().compress(io.BytesIO(FGK_DATA), out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("kind", ["path", "file", "bytes", "bytearray", "memoryview", "chunks"])
+def test_expand_input_types(tmp_path, kind):
+    compressed = _fgk_compressed()
+    path = tmp_path / "in.ahf"
+    path.write_bytes(compressed)
+    src = {
+        "path": str(path),
+        "file": io.BytesIO(compressed),
+        "bytes": compressed,
+        "bytearray": bytearray(compressed),
+        "memoryview": memoryview(compressed),
+        "chunks": (compressed[i:i + 5] for i in range(0, len(compressed), 5)),
+    }[kind]
+    out = io.BytesIO()
+    AdaptiveHuffman().expand(src, out, chunk_size=64)
+    assert out.getvalue() == FGK_DATA
+
+
+def test_fgk_round_trip_through_paths(tmp_path):
+    src, packed, dst = tmp_path / "src.bin", tmp_path / "packed.ahf", tmp_path / "dst.bin"
+    for data in (b"", b"x", os.urandom(3000)):
+        src.write_bytes(data)
+        coder = AdaptiveHuffman()
+        coder.compress(str(src), str(packed), chunk_size=100)
+        coder.expand(str(packed), str(dst), chunk_size=100)
+        assert dst.read_bytes() == data
+
+
+def test_expand_rejects_a_stream_without_end_marker():
+    with pytest.raises(ValueError, match="end marker"):
+        AdaptiveHuffman().expand(_fgk_compressed()[:-3], io.BytesIO())
@@ -0,0 +1,57 @@
+# test_aes_dna.py
+import pytest
+
+import aes_dna
+
+
+@pytest.fixture
+def dna_file(tmp_path):
+    path = tmp_path / "dna_sequence.txt"
+    path.write_text("ACGTTGCAGGCCAATT" * 64)
+    aes_dna.invalidate_key_cache()
+    yield str(path)
+    aes_dna.invalidate_key_cache()
+
+
+def _invalidate_after_lookup(monkeypatch):
+    """Make every cache lookup race with an invalidate_key_cache() before its result is used."""
+    lookup = aes_dna._cached_key
+
+    def racing(*args):
+        result = lookup(*args)
+        aes_dna.invalidate_key_cache()
+        return result
+
+    monkeypatch.setattr(aes_dna, "_cached_key", racing)
+
+
+@pytest.mark.parametrize("warm", [False, True])
+def test_key_survives_invalidation_between_lookup_and_use(dna_file, monkeypatch, warm):
+    expected = aes_dna._derive_key(dna_file, 32)
+    if warm:
+        aes_dna.derive_aes_key_from_dna_file(dna_file)
+    _invalidate_after_lookup(monkeypatch)
+    assert aes_dna.derive_aes_key_from_dna_file(dna_file) == expected
+
+
+def test_kek_derivation_is_cached_until_the_file_changes(dna_file, monkeypatch):
+    from envelope import kek_from_dna_file
+
+    calls = []
+    derive = aes_dna._derive_key
+    monkeypatch.setattr(aes_dna, "_derive_key", lambda *args: calls.append(args) or derive(*args))
+    first = kek_from_dna_file(dna_file)
+    assert kek_from_dna_file(dna_file) == first
+    assert len(calls) == 1
+    with open(dna_file, "a") as f:
+        f.write("GATTACA")
+    assert kek_from_dna_file(dna_file) != first
+    assert len(calls) == 2
+
+
+def test_invalidate_zeroizes_cached_key(dna_file):
+    aes_dna.derive_aes_key_from_dna_file(dna_file)
+    (_, cached), = aes_dna._key_cache.values()
+    aes_dna.invalidate_key_cache(dna_file)
+    assert cached == bytes(len(cached))
+    assert not aes_dna._key_cache
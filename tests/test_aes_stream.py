@@ -0,0 +1,70 @@
+# test_aes_stream.py
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from aes_stream import (
+    HEADER_SIZE, TAG_SIZE, decrypt_file, decrypt_parallel, decrypt_stream, encrypt_parallel, encrypt_stream,
+)
+
+KEY = bytes(range(32))
+SEGMENT = 64
+
+
+def _sealed(data: bytes) -> bytes:
+    return b"".join(encrypt_stream(data, KEY, SEGMENT))
+
+
+@pytest.mark.parametrize("n", [0, 1, SEGMENT - 1, SEGMENT, SEGMENT + 1, 3 * SEGMENT, 5 * SEGMENT + 7])
+def test_round_trip(n):
+    data = os.urandom(n)
+    sealed = _sealed(data)
+    segments = max(-(-n // SEGMENT), 1)  # a full last segment is sealed as last, no empty one follows
+    assert len(sealed) == HEADER_SIZE + n + TAG_SIZE * segments
+    assert b"".join(decrypt_stream(sealed, KEY)) == data
+    assert decrypt_parallel(sealed, KEY, workers=3) == data
+    chunks = (sealed[i:i + 10] for i in range(0, len(sealed), 10))
+    assert b"".join(decrypt_stream(chunks, AESGCM(KEY))) == data
+
+
+def test_parallel_output_is_deterministic_for_a_prefix():
+    data = os.urandom(10 * SEGMENT + 3)
+    prefix = os.urandom(7)
+    one = encrypt_parallel(data, KEY, SEGMENT, workers=1, prefix=prefix)
+    assert encrypt_parallel(data, AESGCM(KEY), SEGMENT, workers=4, prefix=prefix) == one
+    assert b"".join(decrypt_stream(bytes(one), KEY)) == data
+
+
+def test_tampering_is_detected():
+    sealed = bytearray(_sealed(os.urandom(3 * SEGMENT + 5)))
+    size = SEGMENT + TAG_SIZE
+    first, second = HEADER_SIZE, HEADER_SIZE + size
+    swapped = sealed[:first] + sealed[second:second + size] + sealed[first:second] + sealed[second + size:]
+    cut = sealed[:HEADER_SIZE + 2 * size]  # ends on a segment boundary
+    flipped = sealed[:]
+    flipped[-1] ^= 1
+    for bad in (swapped, cut, flipped):
+        with pytest.raises(InvalidTag):
+            b"".join(decrypt_stream(bytes(bad), KEY))
+        with pytest.raises(InvalidTag):
+            decrypt_parallel(bytes(bad), KEY)
+
+
+def test_bad_header_is_a_value_error():
+    sealed = _sealed(b"payload")
+    with pytest.raises(ValueError, match="magic"):
+        list(decrypt_stream(b"XXXX" + sealed[4:], KEY))
+    with pytest.raises(ValueError, match="Truncated"):
+        list(decrypt_stream(sealed[:HEADER_SIZE - 1], KEY))
+
+
+def test_decrypt_file_removes_output_on_failure(tmp_path):
+    src, dst = tmp_path / "sealed", tmp_path / "plain"
+    sealed = bytearray(_sealed(os.urandom(4 * SEGMENT)))
+    sealed[-1] ^= 1
+    src.write_bytes(sealed)
+    with pytest.raises(InvalidTag):
+        decrypt_file(str(src), str(dst), KEY)
+    assert not dst.exists()
@@ -0,0 +1,123 @@
+# test_batch.py
+import os
+
+import pytest
+
+from aes_dna import invalidate_key_cache
+from batch import (
+    FLAG_HUFFMAN, FLAG_WRAPPED_KEY, _HEADER, BatchReader, _read_key_fields, decrypt_batch, encrypt_batch,
+)
+from dna_codec import _PACKED_HEADER
+from envelope import rewrap
+
+RECORDS = [b"alpha", b"", "béta", b"gamma " * 40]
+
+
+@pytest.fixture
+def dna_file(tmp_path):
+    path = tmp_path / "dna.txt"
+    path.write_text("ACGT" * 256)
+    invalidate_key_cache()
+    yield str(path)
+    invalidate_key_cache()
+
+
+def _flags(path) -> int:
+    return _HEADER.unpack_from(path.read_bytes(), 0)[2]
+
+
+def _payload(blob: bytes) -> bytes:
+    return blob[_HEADER.size + _HEADER.unpack_from(blob, 0)[5]:]
+
+
+def test_missing_dna_key_is_an_error(tmp_path):
+    out = tmp_path / "out.dnab"
+    with pytest.raises(FileNotFoundError):
+        encrypt_batch(RECORDS, str(out), dna_key_path=str(tmp_path / "missing.txt"))
+    assert not out.exists()
+
+
+def test_raw_key_only_when_asked_for(tmp_path):
+    out = tmp_path / "out.dnab"
+    assert encrypt_batch(RECORDS, str(out), dna_key_path=None) == len(RECORDS)
+    assert not _flags(out) & FLAG_WRAPPED_KEY
+    assert decrypt_batch(str(out)) == [b"alpha", b"", "béta".encode(), b"gamma " * 40]
+
+
+def test_wrapped_key_round_trip(tmp_path, dna_file):
+    out = tmp_path / "out.dnab"
+    encrypt_batch(RECORDS, str(out), dna_key_path=dna_file)
+    assert _flags(out) & FLAG_WRAPPED_KEY
+    assert decrypt_batch(str(out), dna_file)[3] == b"gamma " * 40
+
+
+def test_rewrap_rotates_batch_files(tmp_path, dna_file):
+    new = tmp_path / "new_dna.txt"
+    new.write_text("GATTACA" * 256)
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    out = archive / "records.dnab"
+    encrypt_batch(RECORDS, str(out), dna_key_path=dna_file)
+    before = out.read_bytes()
+
+    assert rewrap([str(archive)], dna_file, str(new)) == {}
+    after = out.read_bytes()
+    assert _read_key_fields(after)[2] == str(new)
+    assert _payload(after) == _payload(before)
+    # Read back through the DNA key file the header now names, and no longer with the old one
+    assert decrypt_batch(str(out))[3] == b"gamma " * 40
+    with pytest.raises(ValueError):
+        decrypt_batch(str(out), dna_file)
+
+
+def test_version_1_files_still_read(tmp_path, dna_file):
+    out = tmp_path / "out.dnab"
+    encrypt_batch(RECORDS, str(out), dna_key_path=dna_file)
+    blob = out.read_bytes()
+    _, _, _, pos = _read_key_fields(blob)
+    magic, _, flags, nsym, _, index_len = _HEADER.unpack_from(blob, 0)
+    name_len = pos - _HEADER.size - 1 - blob[_HEADER.size] - 2
+    v1_index = blob[_HEADER.size:pos - 2 - name_len] + blob[pos:_HEADER.size + index_len]
+    out.write_bytes(_HEADER.pack(magic, 1, flags, nsym, 0, len(v1_index)) + v1_index
+                    + blob[_HEADER.size + index_len:])
+    assert _read_key_fields(out.read_bytes())[2] is None
+    assert decrypt_batch(str(out), dna_file)[0] == b"alpha"
+
+
+def test_random_access_matches_iteration(tmp_path):
+    records = [f"record {i}: ".encode() + b"x" * (i * 37 % 300) for i in range(200)]
+    out = tmp_path / "out.dnab"
+    encrypt_batch(records, str(out), dna_key_path=None)
+    reader = BatchReader(str(out))
+    assert len(reader) == len(records)
+    assert list(reader) == records
+    for i in (0, 1, 57, 199, -1, -200):
+        assert reader[i] == records[i]
+
+
+def test_incompressible_records_are_stored(tmp_path):
+    records = [os.urandom(n) for n in (0, 1, 50, 20000)]
+    out = tmp_path / "out.dnab"
+    encrypt_batch(records, str(out), dna_key_path=None)
+    assert not _flags(out) & FLAG_HUFFMAN
+    assert decrypt_batch(str(out)) == records
+
+
+def test_damaged_payload_is_corrected(tmp_path):
+    records = [b"line %d" % i for i in range(100)]
+    out = tmp_path / "out.dnab"
+    encrypt_batch(records, str(out), dna_key_path=None, nsym=16)
+    blob = bytearray(out.read_bytes())
+    payload = _HEADER.size + _HEADER.unpack_from(blob, 0)[5] + _PACKED_HEADER.size
+    for p in range(payload, len(blob), 97):  # a few bytes per codeword
+        blob[p] ^= 0x5A
+    out.write_bytes(blob)
+    assert decrypt_batch(str(out)) == records
+    assert BatchReader(str(out))[42] == b"line 42"
+
+
+def test_not_a_batch_file(tmp_path):
+    path = tmp_path / "Cipher.txt"
+    path.write_text("ACGT" * 100)
+    with pytest.raises(ValueError, match="Not a DNA batch file"):
+        BatchReader(str(path))
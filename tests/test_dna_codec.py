@@ -0,0 +1,66 @@
+# test_dna_codec.py
+import os
+
+import numpy as np
+import pytest
+
+from dna_codec import (
+    decode_constrained, decode_constrained_stream, encode_constrained, packed_bytes_stream, packed_from_bytes,
+    read_packed,
+)
+from ecc_utils import add_ecc, decode_ecc
+
+
+def _damage(dna: str, position: int, symbol: str = "N") -> str:
+    return dna[:position] + symbol + dna[position + 1:]
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 300, 301])
+def test_constrained_round_trip(n):
+    data = os.urandom(n)
+    out, invalid = decode_constrained(encode_constrained(data))
+    assert out == data
+    assert not len(invalid)
+
+
+def test_non_base_symbol_keeps_words_aligned():
+    data = os.urandom(300)
+    dna = _damage(encode_constrained(data), 100)
+    out, invalid = decode_constrained(dna)
+    # base 100 is word 50 = bits 150..152 of the stream: only bytes 18 and 19 can change
+    assert len(out) == len(data)
+    assert out[:18] == data[:18] and out[20:] == data[20:]
+    assert invalid.tolist() == [100]
+
+
+def test_positions_are_base_indices_without_whitespace():
+    data = os.urandom(300)
+    dna = _damage(_damage(encode_constrained(data), 100), 10, "G")
+    dna = _damage(dna, 11, "C")  # GC: both strong, breaks word 5
+    wrapped = "\n".join(dna[i:i + 60] for i in range(0, len(dna), 60))
+    out, invalid = decode_constrained(dna)
+    assert decode_constrained(wrapped)[0] == out
+    assert decode_constrained(wrapped)[1].tolist() == invalid.tolist() == [10, 100]
+    chunks = [wrapped[i:i + 37] for i in range(0, len(wrapped), 37)]
+    streamed = list(decode_constrained_stream(chunks))
+    assert b"".join(part for part, _ in streamed) == out
+    assert np.concatenate([bad for _, bad in streamed]).tolist() == [10, 100]
+
+
+def test_erase_mode_reports_bytes():
+    data = os.urandom(300)
+    dna = _damage(encode_constrained(data), 100)
+    assert decode_constrained(dna, erase=True)[1].tolist() == [18, 19]
+
+
+def test_packed_crc_is_optional_for_error_corrected_payloads():
+    data = os.urandom(3000)
+    blob = bytearray(packed_from_bytes(add_ecc(data, 16)))
+    blob[-100] ^= 0xFF  # one corrupted byte: the CRC fails, Reed-Solomon still corrects it
+    with pytest.raises(ValueError, match="checksum"):
+        read_packed(blob)
+    with pytest.raises(ValueError, match="checksum"):
+        next(packed_bytes_stream(blob))
+    assert decode_ecc(b"".join(packed_bytes_stream(blob, verify=False)), 16) == data
+    with pytest.raises(ValueError, match="truncated"):
+        read_packed(blob[:-100], verify=False)
@@ -0,0 +1,88 @@
+# test_ecc_utils.py
+import os
+
+import pytest
+from reedsolo import ReedSolomonError
+
+import ecc_utils
+from ecc_utils import add_ecc, decode_ecc, decode_ecc_stream, deinterleave, get_codec, interleave, rs_encode_batch
+
+NSYM = 16
+DEPTH = 16
+K = 255 - NSYM
+
+# Payload sizes around the interesting boundaries of the last interleave group:
+# fewer message bytes than depth, a few full codewords plus a short one, nearly whole groups
+SIZES = [1, 5, DEPTH - 1, DEPTH, 3 * K + 7, 5 * K + 96, DEPTH * K - 1, DEPTH * K, DEPTH * K + 1,
+         2 * DEPTH * K + 5 * K + 96, 20000, 3 * DEPTH * K + 11 * K]
+
+
+def _last_group_codewords(n: int) -> int:
+    return min(DEPTH, n % (DEPTH * K))
+
+
+@pytest.mark.parametrize("n", [1, K - 1, K, K + 1, 5000])
+def test_depth_one_matches_reedsolo(n):
+    data = os.urandom(n)
+    assert rs_encode_batch(data, NSYM) == add_ecc(data, NSYM) == get_codec(NSYM).encode(data)
+
+
+@pytest.mark.parametrize("depth", [1, 2, 5, DEPTH])
+@pytest.mark.parametrize("n", SIZES)
+def test_round_trip(n, depth):
+    data = os.urandom(n)
+    encoded = rs_encode_batch(data, NSYM, depth=depth)
+    assert deinterleave(interleave(encoded, NSYM, depth), NSYM, depth) == encoded
+    assert decode_ecc(add_ecc(data, NSYM, depth), NSYM, depth) == data
+
+
+@pytest.mark.parametrize("period", [75, 100, 101])
+@pytest.mark.parametrize("n", SIZES)
+def test_periodic_erasures_spread_over_every_group(n, period):
+    # e.g. every 400th (or 300th) base unreadable: one erased byte every 100 (75) bytes
+    data = os.urandom(n)
+    damaged = bytearray(add_ecc(data, NSYM, DEPTH))
+    erased = list(range(0, len(damaged), period))
+    for p in erased:
+        damaged[p] = 0
+    assert decode_ecc(bytes(damaged), NSYM, DEPTH, erase_pos=erased) == data
+    stream = list(decode_ecc_stream([bytes(damaged)], NSYM, depth=DEPTH, erasures=[erased]))
+    assert b"".join(stream) == data
+
+
+@pytest.mark.parametrize("n", [n for n in SIZES if n % (DEPTH * K)])
+def test_burst_in_last_group(n):
+    data = os.urandom(n)
+    damaged = bytearray(add_ecc(data, NSYM, DEPTH))
+    # NSYM / 2 unknown errors per codeword of the last group, as one burst at the very end
+    burst = NSYM // 2 * _last_group_codewords(n)
+    for p in range(len(damaged) - burst, len(damaged)):
+        damaged[p] ^= 0xA5
+    assert decode_ecc(bytes(damaged), NSYM, DEPTH) == data
+
+
+def test_burst_beyond_capacity_is_reported():
+    damaged = bytearray(add_ecc(os.urandom(5 * K + 96), NSYM, DEPTH))
+    for p in range(len(damaged) - 300, len(damaged)):
+        damaged[p] ^= 0xA5
+    with pytest.raises(ReedSolomonError):
+        decode_ecc(bytes(damaged), NSYM, DEPTH)
+
+
+def test_stream_reuses_one_process_pool(monkeypatch):
+    started = []
+
+    class CountingPool(ecc_utils.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            started.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(ecc_utils, "ProcessPoolExecutor", CountingPool)
+    data = os.urandom(6 * DEPTH * K)
+    damaged = bytearray(add_ecc(data, NSYM, DEPTH))
+    for p in range(0, len(damaged), 97):  # every codeword of every window dirty
+        damaged[p] ^= 0xFF
+    window = DEPTH * 255
+    chunks = [bytes(damaged[i:i + window]) for i in range(0, len(damaged), window)]
+    assert b"".join(decode_ecc_stream(chunks, NSYM, depth=DEPTH, workers=2)) == data
+    assert len(started) == 1
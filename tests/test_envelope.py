@@ -0,0 +1,63 @@
+# test_envelope.py
+import os
+
+import pytest
+
+from aes_dna import invalidate_key_cache
+from envelope import is_key_file, kek_from_dna_file, new_data_key, rewrap, unwrap_key, wrap_key
+from meta_utils import dump_meta, load_meta
+
+
+@pytest.fixture
+def dna_files(tmp_path):
+    old = tmp_path / "old_dna.txt"
+    new = tmp_path / "new_dna.txt"
+    old.write_text("ACGT" * 256)
+    new.write_text("GATTACA" * 256)
+    invalidate_key_cache()
+    yield str(old), str(new)
+    invalidate_key_cache()
+
+
+def test_rewrap_directory_skips_files_that_are_not_keys(tmp_path, dna_files):
+    old, new = dna_files
+    data_key = new_data_key()
+    meta = {"wrapped_key": wrap_key(kek_from_dna_file(old), data_key), "nonce": os.urandom(12),
+            "tag": os.urandom(16), "codes": {65: "0", 66: "1"}, "extra": 3}
+    keys = tmp_path / "keys"
+    keys.mkdir()
+    (keys / "Key.txt").write_bytes(dump_meta(meta))
+    (keys / "Cipher.txt").write_text("ACGTTGCA" * 1000)
+    (keys / "notes.txt").write_text("rotation | planned | for | next | week\n")
+
+    assert [is_key_file(str(keys / name)) for name in ("Key.txt", "Cipher.txt", "notes.txt")] == [True, False, False]
+    assert rewrap([str(keys)], old, new) == {}
+    rotated, _ = load_meta((keys / "Key.txt").read_bytes())
+    assert unwrap_key(kek_from_dna_file(new), rotated["wrapped_key"]) == data_key
+    assert (keys / "notes.txt").read_text().startswith("rotation")
+
+
+def test_compact_record_names_the_dna_file_that_wrapped_it(tmp_path, dna_files):
+    from main import data_key as record_key
+
+    old, new = dna_files
+    key = new_data_key()
+    meta = {"wrapped_key": wrap_key(kek_from_dna_file(old), key), "dna_file": old,
+            "nonce": os.urandom(12), "tag": os.urandom(16), "codes": {65: "0", 66: "1"}, "extra": 3}
+    path = tmp_path / "Key.txt"
+    path.write_bytes(dump_meta(meta))
+    loaded, _ = load_meta(path.read_bytes())
+    assert loaded["dna_file"] == old
+    assert record_key(loaded) == key
+
+    assert rewrap([str(path)], old, new) == {}
+    rotated, _ = load_meta(path.read_bytes())
+    assert rotated["dna_file"] == new
+    assert record_key(rotated) == key
+
+
+def test_encrypt_and_save_refuses_a_missing_dna_key(tmp_path):
+    from main import encrypt_and_save
+
+    with pytest.raises(FileNotFoundError):
+        encrypt_and_save(b"payload", dna_key_path=str(tmp_path / "missing.txt"))
@@ -0,0 +1,64 @@
+# test_oligo_packer.py
+import os
+
+import pytest
+
+import oligo_packer
+from dna_codec import screen_oligos
+from oligo_packer import pack_into_oligos, scrambler_mask, unpack_oligos
+
+SIZE = 60
+
+
+@pytest.mark.parametrize("n", [0, 1, SIZE - 1, SIZE, SIZE + 1, 20 * SIZE + 17])
+def test_round_trip(n):
+    data = os.urandom(n)
+    oligos = pack_into_oligos(data, SIZE, workers=1)
+    assert [o["id"] for o in oligos] == list(range(-(-n // SIZE)))
+    assert [o["meta"]["orig_len"] for o in oligos][-1:] == ([n - (len(oligos) - 1) * SIZE] if n else [])
+    assert unpack_oligos(oligos[::-1], workers=1) == data
+
+
+def test_oligos_meet_the_constraints():
+    oligos = pack_into_oligos(os.urandom(200 * SIZE), SIZE, workers=1)
+    mask, _ = screen_oligos([o["dna"] for o in oligos])
+    assert mask.mean() > 0.95
+    # the scrambler search reaches past the identity mask
+    assert any(o["meta"]["scrambler"] for o in oligos)
+
+
+def test_output_does_not_depend_on_workers(monkeypatch):
+    monkeypatch.setattr(oligo_packer, "JOB_OLIGOS", 7)
+    data = os.urandom(50 * SIZE + 5)
+    oligos = pack_into_oligos(data, SIZE, workers=1)
+    assert pack_into_oligos(data, SIZE, workers=3) == oligos
+    assert unpack_oligos(oligos, workers=3) == data
+
+
+def test_unreadable_bases_are_corrected():
+    data = os.urandom(10 * SIZE)
+    oligos = pack_into_oligos(data, SIZE, nsym=20, workers=1)
+    for o in oligos:
+        o["dna"] = "N" * 30 + o["dna"][30:]  # 30 bases: 8 erased bytes out of 20 parity
+    assert unpack_oligos(oligos, workers=1) == data
+
+
+def test_uncorrectable_damage_is_reported():
+    oligos = pack_into_oligos(os.urandom(SIZE), SIZE, nsym=4, workers=1)
+    oligos[0]["meta"]["checksum"] = "00000000"
+    with pytest.raises(ValueError, match="checksum"):
+        unpack_oligos(oligos, workers=1)
+
+
+def test_scrambler_masks_are_deterministic():
+    assert not scrambler_mask(0, 16).any()
+    assert bytes(scrambler_mask(5, 16)) == bytes(scrambler_mask(5, 32)[:16])
+    assert bytes(scrambler_mask(5, 16)) != bytes(scrambler_mask(6, 16))
+
+
+def test_max_attempts_is_deprecated_and_ignored():
+    data = os.urandom(500)
+    with pytest.warns(DeprecationWarning):
+        old = pack_into_oligos(data, 60, 20, 3, 0.40, 0.60, 5, workers=1)
+    assert old == pack_into_oligos(data, workers=1)
+    assert unpack_oligos(old, workers=1) == data